@@ -13,6 +13,8 @@ load_dotenv()
 # For local testing without Atlas, use: "mongodb://localhost:27017"
 MONGO_URL = os.getenv("MONGODB_URI")
 DB_NAME = os.getenv("DB_NAME")
+# Connections per client, request fan-out is bounded below this (utils/concurrency.py)
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", 100))
 
 class Database:
     client: AsyncIOMotorClient = None
@@ -33,7 +35,8 @@ async def get_db():
         db_manager.client = AsyncIOMotorClient(
             MONGO_URL,
             tls=True,
-            tlsCAFile=certifi.where()
+            tlsCAFile=certifi.where(),
+            maxPoolSize=MONGO_MAX_POOL_SIZE
         )
         db_manager.db = db_manager.client[DB_NAME]
     return db_manager.db
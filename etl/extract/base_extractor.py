@@ -3,15 +3,29 @@ from curl_cffi import requests
 from datetime import datetime
 from pathlib import Path
 import pandas as pd
+import asyncio
+import os
 import time
 
 from etl.utils.config_loader import Config
-from etl.utils.log_etl import log_write
+from etl.utils.log_etl import log_write, log_stats
+from etl.utils.fetch import TokenBucket, RETRY_STATUS, backoff_delay, host_of, retry_after_seconds
+from etl.utils.known_keys import KnownKeys
 import mongo.cli as mongo_cli
 
 # ABSTRACT CLASS
 class BaseExtractor(ABC):
 
+    # async fetch mode (get_many): "async" fans requests out, "sync" keeps
+    # the old one-by-one get
+    FETCH_MODE = os.getenv("ETL_FETCH_MODE", "async")
+    FETCH_CONCURRENCY = int(os.getenv("ETL_FETCH_CONCURRENCY", 8))
+    # per host: requests per second and burst
+    FETCH_RATE = float(os.getenv("ETL_FETCH_RATE", 5))
+    FETCH_BURST = int(os.getenv("ETL_FETCH_BURST", 5))
+    FETCH_BACKOFF_BASE = 1
+    FETCH_BACKOFF_CAP = 60
+
     def __init__(self, api_name: str):
         self.api_name = api_name
         self.today = f"{datetime.now().strftime(Config.get_date_format())}_{int(time.time())}"
@@ -22,10 +36,22 @@ class BaseExtractor(ABC):
         # create in case it doesn't exists
         self._raw_path.mkdir(parents=True, exist_ok=True)
         self._clean_path.mkdir(parents=True, exist_ok=True)
+        # (collection, key) -> KnownKeys, loaded once per run
+        self._known_keys = {}
+
+    def known_keys(self, collection, key):
+        if (collection, key) not in self._known_keys:
+            known = KnownKeys(mongo_cli.get_mongo_manager(), collection, key)
+            if known.error is not None:
+                self.log(f"Unable to preload the {key} keys of {collection}, checking one by one: {known.error}")
+            else:
+                kind = "bloom filter" if known.bloom else "set"
+                self.log(f"Preloaded {len(known)} {key} keys of {collection} ({kind})")
+            self._known_keys[(collection, key)] = known
+        return self._known_keys[(collection, key)]
 
     def exists_in_db(self, collection, key, value):
-        mongo_sync = mongo_cli.get_mongo_manager()
-        return mongo_sync.exists_in_db(collection, key, value)
+        return value in self.known_keys(collection, key)
     
     @property
     def raw_path(self):
@@ -76,6 +102,67 @@ class BaseExtractor(ABC):
 
         return None
 
+    async def get_async(self, session, url, params=None, headers=None, retries=3, timeout=30):
+        """
+        One request of get_many: waits for the host's token bucket, retries
+        timeouts, 429 and 5xx with exponential backoff and jitter. A
+        Retry-After pauses the host's bucket instead, the retry waits for it
+        there. None when every attempt fails.
+        """
+        host = host_of(url)
+        bucket = self._buckets.setdefault(host, TokenBucket(self.FETCH_RATE, self.FETCH_BURST))
+
+        for attempt in range(1, retries + 1):
+            await bucket.acquire()
+            retry_after = None
+            try:
+                async with self._fetch_limit:
+                    resp = await session.get(url, params=params, headers=headers or {}, timeout=timeout)
+            except Exception as e:
+                self.log(f"Attempt {attempt}/{retries} failed: {e}")
+            else:
+                if resp.status_code in RETRY_STATUS:
+                    retry_after = retry_after_seconds(resp.headers.get("Retry-After"))
+                    if retry_after:
+                        bucket.pause(retry_after)
+                    self.log(f"Attempt {attempt}/{retries} failed: HTTP {resp.status_code}")
+                elif resp.status_code >= 400:
+                    self.log(f"{url} failed: HTTP {resp.status_code}")
+                    return None
+                else:
+                    try:
+                        return resp.json()
+                    except ValueError as e:
+                        self.log(f"{url} returned invalid JSON: {e}")
+                        return None
+
+            # with Retry-After the next acquire() already waits out the pause
+            if attempt < retries and not retry_after:
+                await asyncio.sleep(
+                    backoff_delay(attempt, self.FETCH_BACKOFF_BASE, self.FETCH_BACKOFF_CAP)
+                )
+
+        return None
+
+    async def _get_many_async(self, calls):
+        self._fetch_limit = asyncio.Semaphore(self.FETCH_CONCURRENCY)
+        self._buckets = {}
+        # one pooled keep-alive session for every request of the batch
+        async with requests.AsyncSession(impersonate="chrome101", max_clients=self.FETCH_CONCURRENCY) as session:
+            return await asyncio.gather(*(
+                self.get_async(session, url, params=params) for url, params in calls
+            ))
+
+    def get_many(self, calls):
+        """
+        [(url, params), ...] -> parsed JSON of each call (None if it failed),
+        in the same order.
+        """
+        calls = list(calls)
+        if self.FETCH_MODE != "async":
+            return [self.get(url, params=params) for url, params in calls]
+        return asyncio.run(self._get_many_async(calls))
+
     def log(self, message):
         log_write(self.api_name,message)
 
@@ -93,19 +180,44 @@ class BaseExtractor(ABC):
     def save_df(self, df, path: Path):
         df.to_csv(path, index=False)
 
-    def run(self):
-        # Extract
+    # stages, also run one by one by the DAG runner (etl/pipelines/dag.py)
+    def run_extract(self):
         df_raw = self.extract_raw()
         raw_file = self._raw_path / f"{self.today}.csv"
         if df_raw is not None:
             if not df_raw.empty:
                 self.save_df(df_raw, raw_file)
+        return df_raw, raw_file
 
-        # Transform
+    def run_transform(self, df_raw):
         df_clean = self.transform(df_raw)
         clean_file = self._clean_path / f"{self.today}.csv"
         if df_clean is not None:
             if not df_clean.empty:
                 self.save_df(df_clean, clean_file)
+        return df_clean, clean_file
+
+    def run(self):
+        # Extract
+        started = time.perf_counter()
+        df_raw, raw_file = self.run_extract()
+        extract_seconds = time.perf_counter() - started
+
+        # Transform
+        started = time.perf_counter()
+        df_clean, clean_file = self.run_transform(df_raw)
+        transform_seconds = time.perf_counter() - started
+
+        # one line with the counters of the run, stored in etl_runs
+        log_stats(self.api_name, {
+            "rows": {
+                "extracted": 0 if df_raw is None else len(df_raw),
+                "transformed": 0 if df_clean is None else len(df_clean)
+            },
+            "stages": {
+                "extract": round(extract_seconds, 3),
+                "transform": round(transform_seconds, 3)
+            }
+        })
 
         return raw_file, clean_file
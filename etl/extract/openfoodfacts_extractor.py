@@ -1,5 +1,6 @@
 from etl.extract.base_extractor import BaseExtractor
 import pandas as pd
+import os
 import time
 import mongo.cli as mongo_cli
 
@@ -7,6 +8,12 @@ class OpenFoodFactsExtractor(BaseExtractor):
 
     SEARCH_URL = "https://world.openfoodfacts.org/cgi/search.pl"
     PAGE_SIZE = 10
+    SEARCH_BATCH = 100
+
+    # the search API is rate limited upstream, keep it slow
+    FETCH_CONCURRENCY = int(os.getenv("OFF_FETCH_CONCURRENCY", 2))
+    FETCH_RATE = float(os.getenv("OFF_FETCH_RATE", 0.5))
+    FETCH_BURST = 1
 
     def __init__(self):
         super().__init__("openfoodfacts")
@@ -25,9 +32,8 @@ class OpenFoodFactsExtractor(BaseExtractor):
 
         return sorted(set(ingredients))
 
-    # Get products from OpenFoodFacts
-    def search_products(self, ingredient):
-        params = {
+    def search_params(self, ingredient):
+        return {
             "search_terms": ingredient,
             "search_simple": 1,
             "action": "process",
@@ -36,13 +42,6 @@ class OpenFoodFactsExtractor(BaseExtractor):
             "page_size": OpenFoodFactsExtractor.PAGE_SIZE
         }
 
-        data = self.get(OpenFoodFactsExtractor.SEARCH_URL, params=params)
-        if data is None:
-            self.log(f"Unable to retrieve the ingredient: {ingredient}")
-            return []
-        return data.get("products", [])
-
-    
     def extract_raw(self):
         ingredients = self.get_unique_ingredients()
         self.log(f"Total obtained ingredients from db {len(ingredients)}")
@@ -58,12 +57,28 @@ class OpenFoodFactsExtractor(BaseExtractor):
 
         self.log(f"Found {len(ingredients)} unique ingredients")
 
-        for i, ingredient in enumerate(ingredients, start=1):
+        # searches fanned out by get_many, a batch at a time so only one
+        # batch of responses is held in memory
+        for start in range(0, len(ingredients), OpenFoodFactsExtractor.SEARCH_BATCH):
+            batch = ingredients[start:start + OpenFoodFactsExtractor.SEARCH_BATCH]
+            responses = self.get_many(
+                (OpenFoodFactsExtractor.SEARCH_URL, self.search_params(ingredient))
+                for ingredient in batch
+            )
+            rows.extend(self.products_to_rows(batch, responses, start, len(ingredients)))
+
+        df = pd.DataFrame(rows)
+        return df
+
+    def products_to_rows(self, ingredients, responses, offset, total):
+        rows = []
+        for i, (ingredient, data) in enumerate(zip(ingredients, responses), start=offset + 1):
 
-            self.log(f"Searching OFF for '{ingredient}' ({i}/{len(ingredients)})")
+            self.log(f"Searching OFF for '{ingredient}' ({i}/{total})")
 
-            products = self.search_products(ingredient)
-            #time.sleep(0.5) #wait to avoid block
+            if data is None:
+                self.log(f"Unable to retrieve the ingredient: {ingredient}")
+            products = (data or {}).get("products", [])
 
             for p in products:
                 code = p.get("code")
@@ -90,8 +105,7 @@ class OpenFoodFactsExtractor(BaseExtractor):
                     "image_url": p.get("image_url")
                 })
 
-        df = pd.DataFrame(rows)
-        return df
+        return rows
 
     def transform(self, df: pd.DataFrame):
         if df is None or df.empty:
@@ -5,6 +5,9 @@ import pandas as pd
 class TheMealDBExtractor(BaseExtractor):
 
     MAX_INGREDIENTS = 40
+    LIST_URL = "https://www.themealdb.com/api/json/v1/1/list.php"
+    FILTER_URL = "www.themealdb.com/api/json/v1/1/filter.php"
+    LOOKUP_URL = "https://www.themealdb.com/api/json/v1/1/lookup.php"
     CONVERSION_TO_GRAMS = {
         "g": 1,
         "gram": 1,
@@ -41,11 +44,10 @@ class TheMealDBExtractor(BaseExtractor):
 
     def get_data_by_country(self):
         
-        url_list_countries = "https://www.themealdb.com/api/json/v1/1/list.php"
         params = {
             'a': 'list'
         }
-        countries_raw = self.get(url_list_countries, params=params) or []
+        countries_raw = self.get(TheMealDBExtractor.LIST_URL, params=params) or {}
         countries = [
             country.get('strArea')
             for country in countries_raw.get('meals',[])
@@ -53,31 +55,26 @@ class TheMealDBExtractor(BaseExtractor):
 
         list_recipies_by_country = {}
 
-        for i, cc in enumerate(countries, start=1):
+        # one request per country, fanned out by get_many
+        responses = self.get_many(
+            (TheMealDBExtractor.FILTER_URL, {'a': cc}) for cc in countries
+        )
+        for i, (cc, recepies_raw) in enumerate(zip(countries, responses), start=1):
             self.log(f"Retrieving recipes for country: {cc} - {i}/{len(countries)} - {round(float(i)/len(countries)*100)}%")
-            url_recipies = "www.themealdb.com/api/json/v1/1/filter.php"
-            params = {
-                'a': cc
-            }
-            recepies_raw = self.get(url_recipies, params=params) or []
-            for meals in recepies_raw.get('meals',[]):
+            recepies_raw = recepies_raw or {}
+            for meals in recepies_raw.get('meals') or []:
                 list_recipies_by_country.setdefault(cc,[]).append(meals)
             
         return list_recipies_by_country
             
     
-    def get_data_by_id(self, id_meal):
-        params = {
-            'i': id_meal,
-        }
-        url_data = "https://www.themealdb.com/api/json/v1/1/lookup.php"
-
-        meal_data = self.get(url_data, params=params) or []
-        meal = meal_data.get('meals',[{}])[0]
+    def parse_meal_data(self, meal_data):
+        meal = (meal_data or {}).get('meals') or [{}]
+        meal = meal[0]
 
         if meal:
             result = {
-                'instructions': meal.get('strInstructions', '').strip()
+                'instructions': (meal.get('strInstructions') or '').strip()
             }
 
             for i in range(1, TheMealDBExtractor.MAX_INGREDIENTS+1):
@@ -93,7 +90,9 @@ class TheMealDBExtractor(BaseExtractor):
 
     def extract_raw(self):
         data_by_country = self.get_data_by_country()
-        rows = []
+
+        # meals not in the db yet, looked up all together afterwards
+        pending = []
         for i, (cc, meals) in enumerate(data_by_country.items(), start=1):
             self.log(
                 f"Retrieving meals data for country: {cc} - {i}/{len(data_by_country)}"
@@ -106,20 +105,29 @@ class TheMealDBExtractor(BaseExtractor):
                 if self.exists_in_db(f"{self.api_name}_raw","_id",int(id_meal)): 
                     continue
 
-                meal_data = self.get_data_by_id(id_meal)
+                pending.append((cc, meal))
 
-                if not meal_data: continue
-                row = {
-                    "_id" : id_meal,
-                    "country" : cc,
-                    "name" : meal["strMeal"],
-                    "imageURL" : meal["strMealThumb"],
-                }
+        self.log(f"Looking up {len(pending)} new meals")
+        responses = self.get_many(
+            (TheMealDBExtractor.LOOKUP_URL, {'i': meal['idMeal']}) for _, meal in pending
+        )
 
-                for k,v in meal_data.items():
-                    row[k] = v
-                
-                rows.append(row)
+        rows = []
+        for (cc, meal), meal_data in zip(pending, responses):
+            meal_data = self.parse_meal_data(meal_data)
+
+            if not meal_data: continue
+            row = {
+                "_id" : meal['idMeal'],
+                "country" : cc,
+                "name" : meal["strMeal"],
+                "imageURL" : meal["strMealThumb"],
+            }
+
+            for k,v in meal_data.items():
+                row[k] = v
+            
+            rows.append(row)
 
         fieldnames = [
             "_id",
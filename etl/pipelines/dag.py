@@ -0,0 +1,244 @@
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from etl.utils.config_loader import Config
+from etl.utils.log_etl import log_write, log_stats
+import mongo.cli as mongo_cli
+from mongo.service import load_all_sync
+
+DAG_WORKERS = int(os.getenv("ETL_DAG_WORKERS", 4))
+STATE_FILE = "dag_state.json"
+# stage outputs not written to the state file
+MEMORY_ONLY = ("df", "inserted")
+
+
+class Stage:
+    """
+    One step of the DAG: runs `func(outputs)` once every stage in `deps`
+    is done. `outputs` holds what the finished stages returned.
+    """
+
+    def __init__(self, name, func, deps=()):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+
+
+# ============================
+# STAGES
+# ============================
+def _read_csv(path):
+    # a CSV may have been renamed by its load stage already
+    path = Path(path)
+    for candidate in (path, path.with_name(path.stem + "_uploaded" + path.suffix)):
+        if candidate.exists():
+            return pd.read_csv(candidate)
+    return pd.DataFrame()
+
+
+def extract_stage(api_name):
+    def run(outputs):
+        extractor = Config.get_extractor_class(api_name)()
+        df_raw, raw_file = extractor.run_extract()
+        # the frame is kept in memory for the transform, the file for --resume
+        return {"raw_file": str(raw_file), "rows": 0 if df_raw is None else len(df_raw), "df": df_raw}
+    return run
+
+
+def transform_stage(api_name):
+    def run(outputs):
+        extract = outputs[f"{api_name}.extract"]
+        df_raw = extract.get("df")
+        if extract.get("resumed"):
+            if not extract["rows"]:
+                # nothing was extracted, there is no raw CSV to read back
+                return {"clean_file": None, "rows": 0}
+            df_raw = _read_csv(extract["raw_file"])
+
+        extractor = Config.get_extractor_class(api_name)()
+        df_clean, clean_file = extractor.run_transform(df_raw)
+        return {"clean_file": str(clean_file), "rows": 0 if df_clean is None else len(df_clean)}
+    return run
+
+
+def load_stage(api_name, mode):
+    def run(outputs):
+        # loads run in parallel threads: each one keeps its own loader state
+        loader = mongo_cli.get_mongo_manager().fork()
+        load_all_sync(loader, apis=[api_name], modes=(mode,))
+        return {
+            "rows": len(loader.inserted.get(f"{api_name}_{mode}", [])),
+            "last_insert": loader.get_last_insert(),
+            "inserted": loader.inserted
+        }
+    return run
+
+
+def refresh_stage(loads):
+    def run(outputs):
+        if not any(outputs[l]["rows"] for l in loads):
+            return {"refreshed": False}
+        # loads done before a resume have no inserted records: full refresh
+        full = any(outputs[l].get("resumed") for l in loads)
+        inserted = {}
+        for l in loads:
+            for coll, records in outputs[l].get("inserted", {}).items():
+                inserted.setdefault(coll, []).extend(records)
+        asyncio.run(mongo_cli.refresh_derived(full=full, inserted=inserted))
+        return {"refreshed": True, "full": full}
+    return run
+
+
+def build_dag():
+    """
+    themealdb: extract -> transform -> load clean / load raw
+    openfoodfacts: extract waits only for the themealdb_clean load (its
+    search terms are the meal ingredients), so it overlaps with the load
+    of themealdb_raw.
+    The derived collections are refreshed once, after every load.
+    """
+    stages = [
+        Stage("themealdb.extract", extract_stage("themealdb")),
+        Stage("themealdb.transform", transform_stage("themealdb"), ["themealdb.extract"]),
+        Stage("themealdb.load_raw", load_stage("themealdb", "raw"), ["themealdb.extract"]),
+        Stage("themealdb.load_clean", load_stage("themealdb", "clean"), ["themealdb.transform"]),
+
+        Stage("openfoodfacts.extract", extract_stage("openfoodfacts"), ["themealdb.load_clean"]),
+        Stage("openfoodfacts.transform", transform_stage("openfoodfacts"), ["openfoodfacts.extract"]),
+        Stage("openfoodfacts.load_raw", load_stage("openfoodfacts", "raw"), ["openfoodfacts.extract"]),
+        Stage("openfoodfacts.load_clean", load_stage("openfoodfacts", "clean"), ["openfoodfacts.transform"]),
+    ]
+
+    # only the pipelines enabled in etl/config.yaml
+    enabled = set(Config.get_apis().keys())
+    stages = [s for s in stages if s.name.split(".")[0] in enabled]
+    names = {s.name for s in stages}
+    for s in stages:
+        s.deps = tuple(d for d in s.deps if d in names)
+
+    loads = [s.name for s in stages if ".load_" in s.name]
+    stages.append(Stage("derived.refresh", refresh_stage(loads), loads))
+    return stages
+
+
+# ============================
+# RUNNER
+# ============================
+class DagState:
+    """
+    Finished stages of the current run, in <export_path>/dag_state.json,
+    so an interrupted run can be resumed without redoing them.
+    """
+
+    def __init__(self, path: Path, resume: bool):
+        self.path = path
+        self.data = None
+        if resume and path.exists():
+            data = json.loads(path.read_text())
+            if not data.get("finished_at"):
+                self.data = data
+        if self.data is None:
+            self.data = {"started_at": datetime.now().isoformat(), "finished_at": None, "stages": {}}
+
+    def done(self, name):
+        return self.data["stages"].get(name, {}).get("status") == "done"
+
+    def output(self, name):
+        return self.data["stages"][name].get("output", {})
+
+    def record(self, name, status, seconds, output=None, error=None):
+        # data frames and inserted records stay in memory, only what can
+        # be serialized is kept
+        output = {k: v for k, v in (output or {}).items() if k not in MEMORY_ONLY}
+        self.data["stages"][name] = {
+            "status": status,
+            "seconds": round(seconds, 3),
+            "output": output,
+            "error": error
+        }
+        self.save()
+
+    def finish(self):
+        self.data["finished_at"] = datetime.now().isoformat()
+        self.save()
+
+    def save(self):
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.data, indent=2))
+        tmp.replace(self.path)
+
+
+def run_dag(stages, resume=False, workers=DAG_WORKERS) -> bool:
+    """
+    Runs every stage as soon as its dependencies are done, up to `workers`
+    at once. A failed stage skips the stages that depend on it, the others
+    keep going. True when every stage finished.
+    """
+    Config.get_export_path().mkdir(parents=True, exist_ok=True)
+    state = DagState(Config.get_export_path() / STATE_FILE, resume)
+
+    outputs = {}
+    pending = {}
+    failed = set()
+    for s in stages:
+        if state.done(s.name):
+            outputs[s.name] = {**state.output(s.name), "resumed": True}
+            log_write("dag", f"{s.name} already done, skipped")
+        else:
+            pending[s.name] = s
+
+    def timed(stage):
+        started = time.perf_counter()
+        try:
+            return stage.func(outputs), None, time.perf_counter() - started
+        except Exception as e:
+            return None, e, time.perf_counter() - started
+
+    running = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while pending or running:
+            for name, s in list(pending.items()):
+                if any(d in failed for d in s.deps):
+                    del pending[name]
+                    failed.add(name)
+                    state.record(name, "skipped", 0, error="dependency failed")
+                    log_write("dag", f"{name} skipped: dependency failed")
+                elif all(d in outputs for d in s.deps):
+                    del pending[name]
+                    log_write("dag", f"{name} started")
+                    running[pool.submit(timed, s)] = s
+
+            if not running:
+                break
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                s = running.pop(future)
+                output, error, seconds = future.result()
+                if error is None:
+                    outputs[s.name] = output
+                    state.record(s.name, "done", seconds, output)
+                    log_write("dag", f"{s.name} done in {seconds:.1f}s")
+                else:
+                    failed.add(s.name)
+                    state.record(s.name, "error", seconds, error=str(error))
+                    log_write("dag", f"{s.name} failed after {seconds:.1f}s: {error}")
+
+    log_stats("dag", {
+        "stages": {name: st["seconds"] for name, st in state.data["stages"].items()}
+    })
+
+    if failed:
+        log_write("dag", f"Finished with failed stages: {sorted(failed)}, run again with --resume")
+        return False
+
+    state.finish()
+    log_write("dag", "All stages done")
+    return True
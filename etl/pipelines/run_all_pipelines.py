@@ -1,11 +1,16 @@
-from etl.pipelines.themealdb_pipeline import run as api1_run
-from etl.pipelines.openfoodfacts_pipeline import run as api2_run
+import sys
+from etl.pipelines.dag import build_dag, run_dag
+from etl.utils.log_etl import start_buffering
 
-def run_all():
-    pipelines = [api1_run, api2_run]
-
-    for pipe in pipelines:
-        pipe()
+def run_all(resume=False):
+    """
+    Extract, transform and load of every pipeline plus the derived
+    refresh, as a DAG: independent stages run at the same time.
+    """
+    return run_dag(build_dag(), resume=resume)
 
 if __name__ == "__main__":
-    run_all()
+    start_buffering()
+    # --resume skips the stages the last unfinished run already did
+    ok = run_all(resume="--resume" in sys.argv)
+    sys.exit(0 if ok else 1)
@@ -1,5 +1,5 @@
 from etl.utils.config_loader import Config
-from etl.utils.log_etl import log_write
+from etl.utils.log_etl import log_write, start_buffering
 
 def run():
     mExtractor = Config.get_extractor_class("themealdb")
@@ -9,4 +9,5 @@ def run():
     log_write("themealdb", f"{clean_file} created")
 
 if __name__ == "__main__":
+    start_buffering()
     run()
\ No newline at end of file
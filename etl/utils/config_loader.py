@@ -31,6 +31,10 @@ class Config:
     def get_mongo_database(cls):
         return cls.load()["mongo"]["database"]
 
+    @classmethod
+    def get_jobs_config(cls):
+        return cls.load().get("jobs", {})
+
     @classmethod
     def get_apis(cls, only_enabled=True):
         """
@@ -0,0 +1,77 @@
+import hashlib
+import math
+import os
+
+# above this many documents the keys go into a Bloom filter instead of a set
+KNOWN_KEYS_BLOOM_ABOVE = int(os.getenv("ETL_KNOWN_KEYS_BLOOM_ABOVE", 1_000_000))
+# false positive rate of the Bloom filter, every positive is confirmed in Mongo
+KNOWN_KEYS_BLOOM_FP = float(os.getenv("ETL_KNOWN_KEYS_BLOOM_FP", 0.001))
+
+
+class BloomFilter:
+    """
+    Compact "maybe seen" set: no false negatives, about `fp_rate` false
+    positives once `capacity` keys are in.
+    """
+
+    def __init__(self, capacity: int, fp_rate: float = KNOWN_KEYS_BLOOM_FP):
+        capacity = max(capacity, 1)
+        self.size = max(int(-capacity * math.log(fp_rate) / math.log(2) ** 2), 8)
+        self.hashes = max(int(round(self.size / capacity * math.log(2))), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value):
+        # double hashing: k positions out of one 128-bit digest
+        digest = hashlib.blake2b(repr(value).encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, value):
+        for pos in self._positions(value):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, value):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(value))
+
+
+class KnownKeys:
+    """
+    Values of `key` already stored in `collection`, read once with a
+    projection-only cursor so the dedup checks of a run don't hit Mongo
+    one by one. Big collections are kept in a Bloom filter, its positives
+    are confirmed with a find_one. If the keys can't be read completely,
+    every check falls back to a find_one (`error` says why).
+    """
+
+    def __init__(self, loader, collection: str, key: str, bloom_above: int = KNOWN_KEYS_BLOOM_ABOVE):
+        self.loader = loader
+        self.collection = collection
+        self.key = key
+
+        count = loader.count_docs(collection)
+        self.bloom = count > bloom_above
+        self.keys = BloomFilter(count) if self.bloom else set()
+        self.size = 0
+        self.confirmed = 0
+        self.error = None
+        try:
+            for value in loader.iter_keys(collection, key):
+                self.keys.add(value)
+                self.size += 1
+        except Exception as e:
+            self.error = e
+            self.keys = None
+
+    def __contains__(self, value):
+        if self.keys is None:
+            return self.loader.exists_in_db(self.collection, self.key, value)
+        if value not in self.keys:
+            return False
+        if not self.bloom:
+            return True
+        self.confirmed += 1
+        return self.loader.exists_in_db(self.collection, self.key, value)
+
+    def __len__(self):
+        return self.size
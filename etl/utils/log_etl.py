@@ -1,17 +1,135 @@
 from datetime import datetime
+import atexit
+import json
 import os
+import signal
+import sys
+import threading
+import time
+
+LOG_DIR = "logs"
+LOG_MAX_BYTES = int(os.getenv("ETL_LOG_MAX_BYTES", 10 * 1024 * 1024))
+LOG_BACKUPS = int(os.getenv("ETL_LOG_BACKUPS", 5))
+LOG_FLUSH_INTERVAL = float(os.getenv("ETL_LOG_FLUSH_INTERVAL", 1))
+
+# lines carrying run counters/timings, picked up by the API into etl_runs
+STATS_MARKER = "[stats]"
 
 def log_format(header, message):
     now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     return f"[{now}] [{header}] {message}"
 
+
+class _LogFile:
+    """
+    Long-lived buffered writer for logs/etl_<header>.log, rotated to
+    .1 .. .N before it goes over LOG_MAX_BYTES.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._open()
+
+    def _open(self):
+        self.file = open(self.path, "a", encoding="utf-8", buffering=64 * 1024)
+        self.size = self.file.tell()
+
+    def write(self, line):
+        # bytes, not characters: the limit holds for non-ASCII lines too
+        size = len(line.encode("utf-8"))
+        if self.size and self.size + size > LOG_MAX_BYTES:
+            self.rotate()
+        self.file.write(line)
+        self.size += size
+
+    def rotate(self):
+        self.file.close()
+        for i in range(LOG_BACKUPS - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        if LOG_BACKUPS > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._open()
+
+    def flush(self):
+        self.file.flush()
+
+
+_files = {}
+_lock = threading.RLock()  # re-entered by the SIGTERM handler
+# started by start_buffering, only in the ETL processes
+_flusher = None
+
+
+def flush_all():
+    with _lock:
+        for f in _files.values():
+            f.flush()
+    sys.stdout.flush()
+
+
+def _flush_periodically():
+    while True:
+        time.sleep(LOG_FLUSH_INTERVAL)
+        try:
+            flush_all()
+        except Exception:
+            pass
+
+
+def _on_sigterm(signum, frame):
+    # flush what is buffered, then terminate as SIGTERM normally does
+    flush_all()
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    os.kill(os.getpid(), signal.SIGTERM)
+
+
+def start_buffering():
+    """
+    Called by the ETL entry points (etl/pipelines, mongo.cli): from now
+    on stdout and the log files are flushed every LOG_FLUSH_INTERVAL and
+    on exit or SIGTERM, not per line. Other processes importing log_write
+    (the API, through the loaders) keep flushing every line and get no
+    thread or signal handler.
+    """
+    global _flusher
+    if _flusher is not None:
+        return
+
+    _flusher = threading.Thread(target=_flush_periodically, name="etl-log-flush", daemon=True)
+    _flusher.start()
+    atexit.register(flush_all)
+
+    # only take SIGTERM over when nobody else handles it (ETL subprocesses,
+    # cancelled from the admin page)
+    if (threading.current_thread() is threading.main_thread()
+            and signal.getsignal(signal.SIGTERM) in (signal.SIG_DFL, None)):
+        signal.signal(signal.SIGTERM, _on_sigterm)
+
+
+def _get_file(header):
+    f = _files.get(header)
+    if f is None:
+        os.makedirs(LOG_DIR, exist_ok=True)
+        f = _files[header] = _LogFile(f"{LOG_DIR}/etl_{header}.log")
+    return f
+
+
 def log_write(header, message):
     m = log_format(header, message)
+    buffered = _flusher is not None
 
-    print(m, flush=True)
-    os.makedirs("logs", exist_ok=True)
+    print(m, flush=not buffered)
 
-    # escribir en archivo en modo append
-    log_file_path = f"logs/etl_{header}.log"
-    with open(log_file_path, "a", encoding="utf-8") as f:
+    with _lock:
+        f = _get_file(header)
         f.write(m + "\n")
+        if not buffered:
+            f.flush()
+
+
+def log_stats(header, stats: dict):
+    log_write(header, f"{STATS_MARKER} {json.dumps(stats)}")
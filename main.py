@@ -11,8 +11,16 @@ from datetime import timedelta, datetime
 from motor.motor_asyncio import AsyncIOMotorClient
 from contextlib import asynccontextmanager
 import models, schemas, utils.auth as auth, database
-from utils.logging_config import setup_logging
+from utils.logging_config import setup_logging, mongo_log_handler
+from utils.meal_nutrition import MEAL_NUTRITION_COLLECTION, refresh_meal_nutrition
+from utils.product_index import load_product_index
+from utils.ingredient_index import load_ingredient_index
+from utils.cache import sync_dataset_version
+from utils.indexes import ensure_indexes
+from utils.log_retention import ensure_log_storage
+from utils.etl_jobs import etl_job_manager
 import logging
+import asyncio
 from pathlib import Path
 import certifi
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
@@ -25,6 +33,37 @@ def print_time():
     logger.info(f"Current time: {datetime.now()}")
 
 
+# startup work left running in background, referenced until it ends
+background_tasks = set()
+
+
+def run_in_background(coro, what: str):
+    """Runs `coro` as a task kept alive until it ends, failures are logged."""
+    def done(task):
+        background_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logging.getLogger(__name__).error(f"{what} failed: {task.exception()!r}")
+
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(done)
+    return task
+
+
+async def sync_dataset():
+    """job: pick up loads done by other processes (cron, other workers)."""
+    db = database.db_manager.db
+
+    async def reload():
+        logger = logging.getLogger(__name__)
+        logger.info("Dataset version changed, reloading in-memory indexes")
+        await load_product_index(db)
+        await load_ingredient_index(db)
+
+    # indexes first, the new version is adopted once they are reloaded
+    await sync_dataset_version(db, reload)
+
+
 # LIFECYCLE EVENTS
 
 @asynccontextmanager
@@ -36,17 +75,37 @@ async def lifespan(app: FastAPI):
     database.db_manager.client = AsyncIOMotorClient(
         database.MONGO_URL,
         tls=True,
-        tlsCAFile=certifi.where()
+        tlsCAFile=certifi.where(),
+        maxPoolSize=database.MONGO_MAX_POOL_SIZE
     )
     database.db_manager.db = database.db_manager.client[database.DB_NAME]
+
+    # Log records are written to Mongo in batches from now on
+    mongo_log_handler.start()
     
-    # Create unique index for username to ensure no duplicates
-    await database.db_manager.db["users"].create_index("username", unique=True)
-    logger.info("MongoDB connected and index created.")
+    # Indexes of every query path (unique username included), idempotent
+    await ensure_log_storage(database.db_manager.db)
+    await ensure_indexes(database.db_manager.db)
+    logger.info("MongoDB connected and indexes ensured.")
+
+    # Ingredient -> product lookups and meal-builder search are served from memory
+    await sync_dataset_version(database.db_manager.db)
+    await load_product_index(database.db_manager.db)
+    await load_ingredient_index(database.db_manager.db)
+
+    # ETL runs requested on any worker are queued and dispatched here too
+    etl_job_manager.start()
+
+    # First boot: build the meal_nutrition view if no load has done it yet
+    db = database.db_manager.db
+    if await db[MEAL_NUTRITION_COLLECTION].estimated_document_count() == 0:
+        logger.info("meal_nutrition is empty, building it in background...")
+        run_in_background(refresh_meal_nutrition(db), "meal_nutrition build")
 
     # Start Scheduler
     scheduler = AsyncIOScheduler()
     scheduler.add_job(print_time, 'interval', seconds=60)
+    scheduler.add_job(sync_dataset, 'interval', seconds=30)
     scheduler.start()
     
     # The application runs while this yield is active
@@ -54,6 +113,10 @@ async def lifespan(app: FastAPI):
     
     # Shutdown Logic
     scheduler.shutdown()
+    for task in list(background_tasks):
+        task.cancel()
+    await etl_job_manager.stop()
+    await mongo_log_handler.stop()
     if database.db_manager.client:
         database.db_manager.client.close()
     logger.info("Shutting down: MongoDB connection closed.")
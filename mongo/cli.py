@@ -1,8 +1,14 @@
 import os
+import sys
+import asyncio
 from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
 from mongo.mongo_sync import MongoLoaderSync
-from mongo.service import load_all_sync
+from mongo.service import load_all_sync, refresh_derived_async
 from etl.utils.config_loader import Config
+from etl.utils.log_etl import start_buffering
+from utils.indexes import ensure_indexes, check_indexes
+from utils.log_retention import ensure_log_storage, backfill_expire_at
 
 load_dotenv()
 
@@ -10,12 +16,58 @@ MONGO_URI = os.getenv("MONGODB_URI") or Config.get_mongo_uri()
 DB_NAME = os.getenv("DB_NAME") or Config.get_mongo_database()
 LOADER = MongoLoaderSync(MONGO_URI, DB_NAME)
 
+async def refresh_derived(full=False, inserted=None):
+    client = AsyncIOMotorClient(MONGO_URI)
+    try:
+        if inserted is None:
+            inserted = LOADER.inserted
+        # full rebuild when the inserted records are not known (resumed runs)
+        await refresh_derived_async(client[DB_NAME], None if full else inserted)
+    finally:
+        client.close()
+
+async def bootstrap_indexes(check=False):
+    client = AsyncIOMotorClient(MONGO_URI)
+    try:
+        db = client[DB_NAME]
+        await ensure_log_storage(db)
+        await ensure_indexes(db)
+        if not check:
+            return True
+
+        report = await check_indexes(db)
+        for r in report:
+            flag = "COLLSCAN" if r["collscan"] else "UNBOUNDED IXSCAN" if r["unbounded"] else "ok"
+            print(f"[{flag}] {r['route']} on {r['collection']}: {' > '.join(r['stages'])}")
+        return not any(r["collscan"] or r["unbounded"] for r in report)
+    finally:
+        client.close()
+
+async def backfill_logs():
+    client = AsyncIOMotorClient(MONGO_URI)
+    try:
+        return await backfill_expire_at(client[DB_NAME])
+    finally:
+        client.close()
+
 def main():    
+    # python -m mongo.cli --check-indexes: apply and explain, no load
+    if "--check-indexes" in sys.argv:
+        sys.exit(0 if asyncio.run(bootstrap_indexes(check=True)) else 1)
+
+    asyncio.run(bootstrap_indexes())
+    if "--backfill-log-expiry" in sys.argv:
+        # logs written before retention policies have no expire_at
+        print(f"expire_at set on {asyncio.run(backfill_logs())} log records")
+        return
     load_all_sync(LOADER)
+    # last_insert is only set when something was written
+    if LOADER.get_last_insert():
+        asyncio.run(refresh_derived())
 
 def get_mongo_manager():
     return LOADER
 
 if __name__ == "__main__":
+    start_buffering()
     main()
-
@@ -2,9 +2,14 @@ from pathlib import Path
 import pandas as pd
 from etl.utils.config_loader import Config
 
-def iter_csvs(base_path=None):
+def iter_csvs(base_path=None, apis=None, modes=("raw", "clean")):
+    """
+    CSVs not uploaded yet, optionally only of some apis / modes.
+    """
     base_path = Path(base_path or Config.get_export_path())
     apis_available = set(Config.get_apis().keys())
+    if apis is not None:
+        apis_available &= set(apis)
 
     for api_folder in base_path.iterdir():
         if not api_folder.is_dir() or api_folder.name not in apis_available:
@@ -12,7 +17,7 @@ def iter_csvs(base_path=None):
 
         api_name = api_folder.name
 
-        for mode in ("raw", "clean"):
+        for mode in modes:
             mode_folder = api_folder / mode
             if not mode_folder.exists():
                 continue
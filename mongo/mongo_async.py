@@ -8,6 +8,9 @@ class MongoLoaderAsync:
     def __init__(self, client, db_name):
         self.db = client[db_name]
         self.last_insert = ""
+        # collection -> records written by this loader, used to refresh
+        # only what changed in the derived collections
+        self.inserted = {}
 
     @staticmethod
     def clean_nan(records):
@@ -33,11 +36,16 @@ class MongoLoaderAsync:
 
         try:
             result = await self.db[collection].insert_many(records, ordered=False)
+            self.inserted.setdefault(collection, []).extend(records)
             self.last_insert = f"[async] Inserted {len(result.inserted_ids)} docs into {collection}"
             log_write("mongo", self.last_insert)
         except BulkWriteError as e:
             # Filter 11000 dup error
             dup_errors = [err for err in e.details['writeErrors'] if err['code'] == 11000]
+            failed = {err['index'] for err in e.details['writeErrors']}
+            self.inserted.setdefault(collection, []).extend(
+                r for i, r in enumerate(records) if i not in failed
+            )
             inserted_count = len(records) - len(dup_errors)
             self.last_insert = f"[async] Inserted {inserted_count} docs into {collection} (duplicates ignored)"
             log_write("mongo", self.last_insert)
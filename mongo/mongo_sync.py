@@ -9,6 +9,21 @@ class MongoLoaderSync:
         self.client = MongoClient(uri)
         self.db = self.client[db_name]
         self.last_insert = ""
+        # collection -> records written by this loader, used to refresh
+        # only what changed in the derived collections
+        self.inserted = {}
+
+    def fork(self):
+        """
+        Loader on the same client with its own inserted / last_insert, for
+        loads running in parallel threads (etl/pipelines/dag.py).
+        """
+        loader = MongoLoaderSync.__new__(MongoLoaderSync)
+        loader.client = self.client
+        loader.db = self.db
+        loader.last_insert = ""
+        loader.inserted = {}
+        return loader
 
     @staticmethod
     def clean_nan(records):
@@ -34,11 +49,16 @@ class MongoLoaderSync:
 
         try:
             result = self.db[collection].insert_many(records, ordered=False)
+            self.inserted.setdefault(collection, []).extend(records)
             self.last_insert = f"[async] Inserted {len(result.inserted_ids)} docs into {collection}"
             log_write("mongo", self.last_insert)
         except BulkWriteError as e:
             # Filter 11000 dup error
             dup_errors = [err for err in e.details['writeErrors'] if err['code'] == 11000]
+            failed = {err['index'] for err in e.details['writeErrors']}
+            self.inserted.setdefault(collection, []).extend(
+                r for i, r in enumerate(records) if i not in failed
+            )
             inserted_count = len(records) - len(dup_errors)
             self.last_insert = f"[async] Inserted {inserted_count} docs into {collection} (duplicates ignored)"
             log_write("mongo", self.last_insert)
@@ -53,6 +73,20 @@ class MongoLoaderSync:
             return False
         return doc is not None
 
+    def count_docs(self, collection):
+        try:
+            return self.db[collection].estimated_document_count()
+        except Exception:
+            return 0
+
+    def iter_keys(self, collection, key, batch_size=10000):
+        # projection-only cursor: just `key` of every document. Errors are
+        # raised, a partial key set would let known documents through
+        projection = {"_id": 1} if key == "_id" else {key: 1, "_id": 0}
+        for doc in self.db[collection].find({}, projection, batch_size=batch_size):
+            if key in doc:
+                yield doc[key]
+
     def get_client(self):
         return self.client
     
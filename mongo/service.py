@@ -1,5 +1,15 @@
 from mongo.csv_iterator import iter_csvs
 from pathlib import Path
+from utils.meal_nutrition import (
+    MEAL_NUTRITION_COLLECTION,
+    changed_meal_ids,
+    refresh_meal_nutrition,
+    update_meal_nutrition
+)
+from utils.health_map import health_map_is_incremental, rebuild_health_map, update_health_map
+from utils.product_index import load_product_index
+from utils.ingredient_index import load_ingredient_index
+from utils.cache import bump_dataset_version
 
 def df_to_records(df):
     records = df.to_dict(orient="records")
@@ -11,9 +21,40 @@ def mark_uploaded(csv_file: Path):
     )
     csv_file.rename(new_name)
 
+# --- DERIVED DATA ---
+async def refresh_derived_async(db, inserted=None):
+    """
+    Views built from the clean collections, refreshed after every load.
+    With the records written by the loader (loader.inserted) only the
+    meals and countries they touch are recalculated.
+    """
+    # in-process indexes of the API: ingredient -> product lookups and
+    # the meal-builder search
+    await load_product_index(db)
+    await load_ingredient_index(db)
+
+    incremental = (
+        inserted is not None
+        and await db[MEAL_NUTRITION_COLLECTION].estimated_document_count() > 0
+        and await health_map_is_incremental(db)
+    )
+
+    if not incremental:
+        await refresh_meal_nutrition(db)
+        await rebuild_health_map(db)
+    else:
+        meal_ids = await changed_meal_ids(db, inserted)
+        if meal_ids:
+            previous, meals = await update_meal_nutrition(db, meal_ids)
+            await update_health_map(db, previous, meals)
+
+    # last, once everything is rebuilt: results cached meanwhile keep the
+    # previous version and are never served again
+    await bump_dataset_version(db)
+
 # --- SYNC ---
-def load_all_sync(loader, base_path=None):
-    for df, api_name, mode, csv_file in iter_csvs(base_path):
+def load_all_sync(loader, base_path=None, apis=None, modes=("raw", "clean")):
+    for df, api_name, mode, csv_file in iter_csvs(base_path, apis, modes):
         records = df_to_records(df)
         loader.insert(records, f"{api_name}_{mode}")
         mark_uploaded(csv_file)
@@ -27,5 +68,8 @@ async def load_all_async(loader, base_path=None):
         await loader.insert(records, f"{api_name}_{mode}")
         mark_uploaded(csv_file)
 
-    return loader.get_last_insert()
+    # last_insert is only set when something was written
+    if loader.get_last_insert():
+        await refresh_derived_async(loader.db, loader.inserted)
 
+    return loader.get_last_insert()
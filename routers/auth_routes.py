@@ -22,7 +22,7 @@ async def register_user(user: schemas.UserCreate, db = Depends(database.get_db))
         logger.warning(f"Registration failed: Username {user.username} already exists")
         raise HTTPException(status_code=400, detail="Username already registered")
     
-    hashed_password = auth.get_password_hash(user.password)
+    hashed_password = await auth.get_password_hash_async(user.password)
     
     # Create User Dict (MongoDB Document), including role
     user_doc = models.UserInDB(
@@ -49,13 +49,28 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
     logger.info(f"Login attempt for user: {form_data.username}")
     user = await db["users"].find_one({"username": form_data.username})
     
-    if not user or not auth.verify_password(form_data.password, user["hashed_password"]):
+    valid, new_hash = (False, None)
+    if user:
+        valid, new_hash = await auth.verify_and_update_password_async(
+            form_data.password, user["hashed_password"]
+        )
+
+    if not valid:
         logger.warning(f"Login failed for user: {form_data.username}")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+
+    # bcrypt cost changed since this hash was made: store it with the new one
+    if new_hash:
+        await db["users"].update_one(
+            {"_id": user["_id"]},
+            {"$set": {"hashed_password": new_hash}}
+        )
+        auth.invalidate_user(user["_id"])
+        logger.info(f"Password rehashed for user: {form_data.username}")
     
     access_token_expires = timedelta(minutes=auth.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = auth.create_access_token(
@@ -1,45 +1,74 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import StreamingResponse
 from database import db_manager
 import utils.auth as auth
-from utils.meal_functions import calculate_meal_from_docs  # import functions from meal_functions
+import json
+from utils.meal_nutrition import MEAL_NUTRITION_COLLECTION
+from utils.pagination import encode_cursor, decode_cursor
+
+NDJSON = "application/x-ndjson"
 
 router = APIRouter(prefix="/filters", tags=["Nutrient Filters"])
 
 
+async def stream_meals(nutrition_col, query: dict):
+    # meals are sent as they come from the cursor, nothing is accumulated
+    cursor = (
+        nutrition_col.find(query, projection={"_id": 0})
+        .sort("mealID", 1)
+        .batch_size(200)
+    )
+    async for meal in cursor:
+        yield json.dumps(meal) + "\n"
+
+
 # ============================
 # ENDPOINT GET FILTERS
 # ============================
 @router.get("/meals")
 async def filter_meals(
+    request: Request,
     max_calories: float | None = None,
     min_protein: float | None = None,
     max_fat: float | None = None,
     max_carbs: float | None = None,
+    limit: int = Query(100, ge=1, le=500, description="Meals per page (max 500)"),
+    cursor: str | None = Query(None, description="next_cursor of the previous page"),
     current_user: dict = Depends(auth.get_current_user)
 ):
-    meals_col = db_manager.db["themealdb_clean"]
-    meal_ids = await meals_col.distinct("mealID")
-
-    results = []
+    """
+    JSON pages of `limit` meals, or with `Accept: application/x-ndjson`
+    every matching meal streamed one per line.
+    """
+    # meal_nutrition holds one precalculated document per meal
+    nutrition_col = db_manager.db[MEAL_NUTRITION_COLLECTION]
 
-    for meal_id in meal_ids:
-        docs = await meals_col.find({"mealID": meal_id}).to_list(1000)
-        meal = await calculate_meal_from_docs(docs, db_manager.db["openfoodfacts_clean"])
-        if not meal:
-            continue
+    query = {}
+    if max_calories is not None:
+        query["nutrients.energy_kcal"] = {"$lte": max_calories}
+    if min_protein is not None:
+        query["nutrients.proteins"] = {"$gte": min_protein}
+    if max_fat is not None:
+        query["nutrients.fat"] = {"$lte": max_fat}
+    if max_carbs is not None:
+        query["nutrients.carbohydrates"] = {"$lte": max_carbs}
+    if cursor is not None:
+        query["mealID"] = {"$gt": decode_cursor(cursor)}
 
-        n = meal["nutrients"]
+    if NDJSON in request.headers.get("accept", ""):
+        return StreamingResponse(stream_meals(nutrition_col, query), media_type=NDJSON)
 
-        if max_calories is not None and n["energy_kcal"] > max_calories:
-            continue
-        if min_protein is not None and n["proteins"] < min_protein:
-            continue
-        if max_fat is not None and n["fat"] > max_fat:
-            continue
-        if max_carbs is not None and n["carbohydrates"] > max_carbs:
-            continue
+    # one extra meal tells whether there is a next page
+    results = await (
+        nutrition_col.find(query, projection={"_id": 0})
+        .sort("mealID", 1)
+        .limit(limit + 1)
+        .to_list(length=limit + 1)
+    )
+    has_more = len(results) > limit
+    results = results[:limit]
 
-        results.append(meal)
+    next_cursor = encode_cursor(results[-1]["mealID"]) if has_more else None
 
     return {
         "filters": {
@@ -48,6 +77,9 @@ async def filter_meals(
             "max_fat": max_fat,
             "max_carbs": max_carbs
         },
+        # meals in this page, has_more says whether others match too
         "matches": len(results),
-        "meals": results
+        "meals": results,
+        "has_more": has_more,
+        "next_cursor": next_cursor
     }
@@ -1,20 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from database import db_manager
 import utils.auth as auth
 from typing import List
+import heapq
+from utils.ingredient_index import get_ingredient_index
 from utils.meal_functions import (
     clean_ingredients,
     get_matched_ingredients,
-    calculate_nutrients_for_filtered_ingredients,
+    calculate_filtered_nutrients_for_meals,
     calculate_meal_nutriscore
 )
 
 router = APIRouter(prefix="/meal-builder", tags=["Meal Builder"])
 
 
+def _rank_key(result: dict):
+    # best match first, then healthiest, then lowest mealID to break ties
+    return (result["match_percentage"], result["nutrition_score"], -result["meal_id"])
+
+
 @router.post("")
 async def find_meals_with_nutrition(
     ingredients: List[str],
+    page: int = Query(1, ge=1, description="Page number"),
+    limit: int = Query(15, ge=1, le=100, description="Meals per page (max 100)"),
     current_user: dict = Depends(auth.get_current_user)
 ):
     if not ingredients:
@@ -24,69 +33,60 @@ async def find_meals_with_nutrition(
     if not ingredients_clean:
         raise HTTPException(status_code=400, detail="Ingredientes inválidos")
 
-    meals_col = db_manager.db["themealdb_clean"]
     products_col = db_manager.db["openfoodfacts_clean"]
 
-    all_meal_ids: set[int] = set()
-
-    for ingredient in ingredients_clean:
-        matching = await meals_col.find({
-            "ingredient": {"$regex": ingredient, "$options": "i"}
-        }).to_list(length=30)
-
-        for meal in matching:
-            meal_id = meal.get("mealID")
-            if meal_id:
-                all_meal_ids.add(meal_id)
-
-    if not all_meal_ids:
-        return {"count": 0, "results": []}
-
-    results = []
-
-    for meal_id in list(all_meal_ids)[:15]:
-        meal_ingredients = await meals_col.find({"mealID": meal_id}).to_list(length=None)
-        if not meal_ingredients:
-            continue
-
-        meal_data = meal_ingredients[0]
-
-        matched_ingredients = get_matched_ingredients(
-            meal_ingredients,
-            ingredients_clean
-        )
-
-        nutrients, used = await calculate_nutrients_for_filtered_ingredients(
-            meal_ingredients,
-            ingredients_clean,
-            products_col
-        )
-
-        if used == 0:
-            continue
-
-        nutrition_score = calculate_meal_nutriscore(nutrients)
-
-        results.append({
-            "meal_id": meal_id,
-            "name": meal_data.get("name", "Unknown"),
-            "country": meal_data.get("country", "Unknown"),
-            "image": meal_data.get("imageURL"),
-            "match_percentage": round(
-                (len(matched_ingredients) / len(ingredients_clean)) * 100, 1
-            ),
-            "matched_ingredients": matched_ingredients,
-            "nutrition_score": nutrition_score,
-            "calories": round(nutrients["energy_kcal"], 0),
-            "protein": round(nutrients["proteins"], 1)
-        })
-
-    results.sort(
-        key=lambda x: (x["match_percentage"], x["nutrition_score"]),
-        reverse=True
+    # candidates come from the in-memory ingredient -> meals index
+    index = await get_ingredient_index(db_manager.db)
+    docs_by_meal = {
+        meal_id: index.meals[meal_id]
+        for meal_id in index.candidates(ingredients_clean)
+    }
+
+    if not docs_by_meal:
+        return {"count": 0, "total": 0, "page": page, "limit": limit, "results": []}
+
+    nutrients_by_meal = await calculate_filtered_nutrients_for_meals(
+        docs_by_meal,
+        ingredients_clean,
+        products_col
     )
 
+    def scored_meals():
+        for meal_id, meal_ingredients in docs_by_meal.items():
+            nutrients, used = nutrients_by_meal[meal_id]
+            if used == 0:
+                continue
+
+            meal_data = meal_ingredients[0]
+
+            matched_ingredients = get_matched_ingredients(
+                meal_ingredients,
+                ingredients_clean
+            )
+
+            yield {
+                "meal_id": meal_id,
+                "name": meal_data.get("name", "Unknown"),
+                "country": meal_data.get("country", "Unknown"),
+                "image": meal_data.get("imageURL"),
+                "match_percentage": round(
+                    (len(matched_ingredients) / len(ingredients_clean)) * 100, 1
+                ),
+                "matched_ingredients": matched_ingredients,
+                "nutrition_score": calculate_meal_nutriscore(nutrients),
+                "calories": round(nutrients["energy_kcal"], 0),
+                "protein": round(nutrients["proteins"], 1)
+            }
+
+    # every candidate is scored, only the best page*limit are kept in the heap
+    total = sum(1 for meal_id in docs_by_meal if nutrients_by_meal[meal_id][1] > 0)
+    top = heapq.nlargest(page * limit, scored_meals(), key=_rank_key)
+    results = top[(page - 1) * limit:]
+
     return {
         "count": len(results),
+        "total": total,
+        "page": page,
+        "limit": limit,
         "results": results
     }
@@ -1,12 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException
 from database import db_manager
 import utils.auth as auth
+from utils.cache import meal_cache, read_through
 from datetime import datetime, date
 from utils.meal_functions import extract_grams, calculate_meal_nutriscore
 import re
 
 router = APIRouter(prefix="/mystats", tags=["My Stats"])
 
+@read_through(meal_cache)
 async def calculate_meal(meal_id: int) -> dict | None:
     meals_col = db_manager.db["themealdb_clean"]
     products_col = db_manager.db["openfoodfacts_clean"]
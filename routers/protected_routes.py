@@ -2,301 +2,204 @@ from fastapi import APIRouter, Depends, HTTPException, status, Request, Query
 import schemas, utils.auth as auth
 import asyncio
 import os
-import signal
-from mongo.mongo_async import MongoLoaderAsync
-from mongo.service import load_all_async
 from database import db_manager
 from datetime import datetime
-from utils.process_manager import watch_process_load
 
 import database
+from utils.cache import ResultCache, meal_cache, user_cache, dataset_version
+from utils.concurrency import gather_bounded
+from utils.logging_config import mongo_log_handler
+from utils.pagination import encode_cursor, decode_cursor
+from utils.indexes import check_indexes
+from utils.log_retention import LOG_STORAGE_MODE, RETENTION_POLICIES
+from utils.etl_runs import last_finished_run, run_history
+from utils.etl_jobs import etl_job_manager, get_pipelines, resolve_pipeline
+from utils.log_stream import log_stream, LAGGING
+from fastapi.responses import StreamingResponse
 from bson import ObjectId
 from fastapi import Body
 import logging
 
 router = APIRouter()
 
-# PROTECTED ROUTES
+# seconds between keepalives of an idle live tail
+LOG_STREAM_KEEPALIVE = float(os.getenv("LOG_STREAM_KEEPALIVE", 15))
 
-@router.get("/users/me", response_model=schemas.UserResponse)
-async def read_users_me(current_user: dict = Depends(auth.get_current_user)):
-    # Get details of the currently logged-in user.
-    return current_user
+# /admin/collections answer, kept for a few seconds
+collection_stats_cache = ResultCache(
+    "collection_stats",
+    maxsize=1,
+    ttl=float(os.getenv("COLLECTION_STATS_TTL", 30))
+)
 
-@router.get("/system/status")
-async def get_system_status(current_user: dict = Depends(auth.get_current_user)):
+# PROTECTED ROUTES
+
+async def etl_history_page(db, pipeline: str, limit: int, cursor: str | None) -> dict:
     """
-    Simulates a secure command endpoint for distributed nodes.
+    One page of the etl_runs ledger of a pipeline, newest first.
     """
-    return {
-        "status": "operational",
-        "secret_data": "Whatever you want to hide",
-        "authenticated_as": current_user["username"],
-        "role": current_user["role"],
-        "backend": "MongoDB Atlas"
-    }
-
-# API 1
-
-# ------------------------------------------------------------
-
-@router.get("/admin/etl-api1/logs")
-async def get_etl_api1_logs(limit: int = 10, current_user: dict = Depends(auth.get_current_user)):
-    if current_user["role"] != "role_admin":
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Admin only"
-        )
-
-    name_etl_log = "etl_api1"
-    results = db_manager.db.results_etl
-    logs = db_manager.db.logs
-
-    etl = await results.find_one({"_id": name_etl_log})
+    before = None
+    if cursor is not None:
+        try:
+            started_at, run_id = decode_cursor(cursor)
+            before = (datetime.fromisoformat(started_at), run_id)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    runs = await run_history(db, pipeline, limit, before)
+    next_cursor = None
+    if len(runs) == limit:
+        next_cursor = encode_cursor([runs[-1]["started_at"].isoformat(), runs[-1]["_id"]])
+
+    messages = [r["result"] or f"[{r['started_at']}] {r['status']}" for r in runs]
+    if not messages and cursor is None:
+        messages = ["Never has been run an ETL"]
 
-    if not etl:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="ETL not found"
-        )
+    return {"messages": messages, "runs": runs, "next_cursor": next_cursor}
 
-    pid = etl.get("pid")
-    if not pid:
-        return {"lines": []}
-    
-    cursor = (
-        logs.find(
-            {
-                "pid": pid,
-                "logger": name_etl_log
-            },
-            {
-                "_id": 0,
-                "timestamp": 1,
-                "level": 1,
-                "message": 1
-            }
-        )
-        .sort("timestamp", -1)
-        .limit(limit)
-    )
 
-    docs = await cursor.to_list(length=limit)
+def format_log_line(doc: dict) -> str:
+    # live documents are tz-aware, the ones read back from Mongo are naive UTC
+    timestamp = doc["timestamp"].replace(tzinfo=None)
+    return f"[{timestamp}] [{doc['level']}] {doc['message']}"
 
-    docs.reverse()
 
-    return {
-        "pid": pid,
-        "lines": [
-            f"[{d['timestamp']}] [{d['level']}] {d['message']}"
-            for d in docs
-        ]
-    }
+def sse_event(data: str, event: str | None = None) -> str:
+    head = f"event: {event}\n" if event else ""
+    return head + "".join(f"data: {line}\n" for line in data.split("\n")) + "\n"
 
-@router.post("/admin/etl-api1/cancel", status_code=200)
-async def cancel_etl_api1(current_user: dict = Depends(auth.get_current_user)):
-    if current_user["role"] != "role_admin":
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Admin only"
-        )
-    
-    logger = logging.getLogger("etl-api1-cancel")
 
-    name_etl_log = "etl_api1"
+async def etl_log_events(request: Request, name: str, limit: int):
+    """
+    Server-Sent Events of the current run of an ETL: the last `limit` lines,
+    then every new line as watch_process_load writes it, then an `end`
+    event with the final status. Idle clients cost one keepalive comment
+    every LOG_STREAM_KEEPALIVE seconds and no query while nothing runs.
+    """
     results = db_manager.db.results_etl
+    logs = db_manager.db.logs
 
-    # gets the ETL in execution
-    etl = await results.find_one({
-        "_id": name_etl_log,
-        "status": "running"
-    })
-
+    etl = await results.find_one({"_id": name})
     if not etl:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="ETL api1 is not running"
-        )
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="ETL not found")
 
+    run_id = etl.get("run_id")
     pid = etl.get("pid")
-    if not pid:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="ETL running but PID not found"
-        )
-
-    try:
-        os.killpg(pid, signal.SIGTERM)  # kill
-        logger.warning("ETL api1 cancelled (SIGTERM) pid=%s", pid)
-    except ProcessLookupError:
-        logger.warning("ETL api1 pid=%s not found", pid)
-    except PermissionError:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="No permission to kill this process"
-        )
-
-    await results.update_one(
-        {"_id": name_etl_log},
-        {"$set": {
-            "status": "cancelled",
-            "finished_at": datetime.utcnow(),
-            "error": "Cancelled by admin"
-        }}
+    running = etl.get("status") in ("running", "cancelling")
+
+    # subscribe before reading the backlog so no line falls in between
+    queue = log_stream.subscribe(run_id) if running else None
+
+    async def events():
+        nonlocal queue
+        last_seq = -1
+        try:
+            if pid:
+                backlog = await (
+                    logs.find(
+                        {"pid": pid, "logger": name},
+                        {"_id": 0, "timestamp": 1, "level": 1, "message": 1, "seq": 1}
+                    )
+                    .sort([("timestamp", -1), ("seq", -1)])
+                    .limit(limit)
+                    .to_list(length=limit)
+                )
+                for doc in reversed(backlog):
+                    last_seq = max(last_seq, doc.get("seq", -1))
+                    yield sse_event(format_log_line(doc))
+
+            while queue is not None:
+                try:
+                    docs = await asyncio.wait_for(queue.get(), LOG_STREAM_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    # the run may belong to another worker: catch up from Mongo
+                    etl_now = await results.find_one({"_id": name}, {"status": 1, "run_id": 1})
+                    if not etl_now or etl_now.get("run_id") != run_id or etl_now.get("status") not in ("running", "cancelling"):
+                        break
+                    docs = await (
+                        logs.find({"pid": pid, "logger": name, "seq": {"$gt": last_seq}})
+                        .sort("seq", 1)
+                        .to_list(length=None)
+                    )
+                    if not docs:
+                        yield ": keepalive\n\n"
+                        continue
+
+                if docs is None:
+                    break
+                if docs is LAGGING:
+                    # dropped for falling behind: resubscribe, then replay
+                    # from Mongo what was published meanwhile
+                    queue = log_stream.subscribe(run_id)
+                    docs = await (
+                        logs.find({"pid": pid, "logger": name, "seq": {"$gt": last_seq}})
+                        .sort("seq", 1)
+                        .to_list(length=None)
+                    )
+                for doc in docs:
+                    if doc.get("seq", -1) <= last_seq:
+                        continue
+                    last_seq = doc["seq"]
+                    yield sse_event(format_log_line(doc))
+
+            final = await results.find_one({"_id": name}, {"status": 1})
+            yield sse_event(final.get("status", "unknown") if final else "unknown", event="end")
+        finally:
+            if queue is not None:
+                log_stream.unsubscribe(run_id, queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
 
-    return {
-        "status": "cancelled",
-        "pid": pid
-    }
-
-@router.post("/admin/etl-api1/run", status_code=202)
-async def run_sh_and_load(current_user: dict = Depends(auth.get_current_user)):
-    if current_user["role"] != "role_admin":
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Admin only"
-        )
-
-    name_etl_log = "etl_api1"
-    results = db_manager.db.results_etl
-
-    # avoid two ETL at the same time
-    running = await results.find_one({
-        "_id": name_etl_log,
-        "status": "running"
-    })
-
-    if running:
-        raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail="ETL api1 is already running by you or other user"
-        )
-
-    # launch process
-    process = await asyncio.create_subprocess_exec(
-        "python3", "-m", "etl.pipelines.themealdb_pipeline",
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.STDOUT,
-        start_new_session=True
-    )
-
-
-    # save initial state
-    await results.update_one(
-        {"_id": name_etl_log},
-        {"$set": {
-            "status": "running",
-            "started_at": datetime.utcnow(),
-            "finished_at": None,
-            "pid": process.pid,
-            "error": None
-        }},
-        upsert=True
-    )
-
-    #launch a watcher when the scrap ends launch de loader
-    logger = logging.getLogger(name_etl_log)
-
-    #final output
-    timestamp = datetime.utcnow()
-    logger_output = logging.getLogger(f"etl_api1_{timestamp}")
-
-    asyncio.create_task(
-        watch_process_load(process, name_etl_log, db_manager, logger, logger_output)
-    )
+@router.get("/users/me", response_model=schemas.UserResponse)
+async def read_users_me(current_user: dict = Depends(auth.get_current_user)):
+    # Get details of the currently logged-in user.
+    return current_user
 
+@router.get("/system/status")
+async def get_system_status(current_user: dict = Depends(auth.get_current_user)):
+    """
+    Simulates a secure command endpoint for distributed nodes.
+    """
     return {
-        "status": "accepted",
-        "message": "ETL api1 started",
-        "pid": process.pid
+        "status": "operational",
+        "secret_data": "Whatever you want to hide",
+        "authenticated_as": current_user["username"],
+        "role": current_user["role"],
+        "backend": "MongoDB Atlas"
     }
 
-@router.get("/admin/etl-api1/status")
-async def get_etl_status(current_user: dict = Depends(auth.get_current_user)):
-    if current_user["role"] != "role_admin":
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Admin only"
-        )
-
-    logs = db_manager.db.results_etl
-    etl_name = "etl_api1"
-
-    status_doc = await logs.find_one({"_id": etl_name})
-
-    if not status_doc:
-        return {
-            "status": "idle",
-            "message": "ETL has not been started yet"
-        }
-
-    return {
-        "status": status_doc.get("status", "unknown"),
-        "started_at": status_doc.get("started_at"),
-        "finished_at": status_doc.get("finished_at"),
-        "error": status_doc.get("error")
-    }
+# ETL PIPELINES
+# /admin/etl-api1/... and /admin/etl-api2/... (or the pipeline key of
+# etl/config.yaml) are served by the same handlers through the job manager
 
-@router.get("/admin/etl-api1/results")
-async def get_last_etl_result(current_user: dict = Depends(auth.get_current_user)):
+def admin_pipeline(api: str, current_user: dict) -> str:
     if current_user["role"] != "role_admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Admin only"
         )
 
-    logs = db_manager.db.logs
-    etl_prefix = "etl_api1_"
-
-    # last log with etl_api1_
-    last_log = await logs.find_one(
-        {"logger": {"$regex": f"^{etl_prefix}"}},
-        sort=[("timestamp", -1)],
-        projection={"_id": 0, "message": 1}
-    )
-
-    if not last_log:
-        return {"message": "Never has been run an ETL"}
-
-    return {"message": last_log["message"]}
-
-@router.get("/admin/etl-api1/history")
-async def get_etl_history(current_user: dict = Depends(auth.get_current_user)):
-    if current_user["role"] != "role_admin":
+    pipeline = resolve_pipeline(api)
+    if pipeline is None:
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Admin only"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"ETL {api} not found"
         )
+    return pipeline
 
-    logs = db_manager.db.logs
-    etl_prefix = "etl_api1_"
-
-    cursor = logs.find(
-        {"logger": {"$regex": f"^{etl_prefix}"}},
-        projection={"_id": 0, "message": 1}
-    ).sort("timestamp", -1)
-
-    all_logs = await cursor.to_list(length=None)
-
-    messages = [log["message"] for log in all_logs]
-
-    if not messages:
-        messages = ["Never has been run an ETL"]
-
-    return {"messages": messages}
-
-# API 2
+# ------------------------------------------------------------
 
-@router.get("/admin/etl-api2/logs")
-async def get_etl_api2_logs(limit: int = 10, current_user: dict = Depends(auth.get_current_user)):
-    if current_user["role"] != "role_admin":
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Admin only"
-        )
+@router.get("/admin/etl-{api}/logs")
+async def get_etl_logs(api: str, limit: int = 10, current_user: dict = Depends(auth.get_current_user)):
+    pipeline = admin_pipeline(api, current_user)
 
-    name_etl_log = "etl_api2"
+    name_etl_log = get_pipelines()[pipeline]["name"]
     results = db_manager.db.results_etl
     logs = db_manager.db.logs
 
@@ -325,7 +228,7 @@ async def get_etl_api2_logs(limit: int = 10, current_user: dict = Depends(auth.g
                 "message": 1
             }
         )
-        .sort("timestamp", -1)
+        .sort([("timestamp", -1), ("seq", -1)])
         .limit(limit)
     )
 
@@ -335,143 +238,59 @@ async def get_etl_api2_logs(limit: int = 10, current_user: dict = Depends(auth.g
 
     return {
         "pid": pid,
-        "lines": [
-            f"[{d['timestamp']}] [{d['level']}] {d['message']}"
-            for d in docs
-        ]
+        "lines": [format_log_line(d) for d in docs]
     }
 
-@router.post("/admin/etl-api2/cancel", status_code=200)
-async def cancel_etl_api2(current_user: dict = Depends(auth.get_current_user)):
-    if current_user["role"] != "role_admin":
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Admin only"
-        )
-    
-    logger = logging.getLogger("etl-api2-cancel")
+@router.get("/admin/etl-{api}/logs/stream")
+async def stream_etl_logs(
+    api: str,
+    request: Request,
+    limit: int = 10,
+    current_user: dict = Depends(auth.get_current_user)
+):
+    pipeline = admin_pipeline(api, current_user)
+    return await etl_log_events(request, get_pipelines()[pipeline]["name"], limit)
 
-    name_etl_log = "etl_api2"
-    results = db_manager.db.results_etl
+@router.post("/admin/etl-{api}/cancel", status_code=200)
+async def cancel_etl(api: str, current_user: dict = Depends(auth.get_current_user)):
+    pipeline = admin_pipeline(api, current_user)
+    logger = logging.getLogger(f"etl-{api}-cancel")
 
-    # gets the ETL in execution
-    etl = await results.find_one({
-        "_id": name_etl_log,
-        "status": "running"
-    })
+    cancelled = await etl_job_manager.cancel(pipeline)
 
-    if not etl:
+    if cancelled is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="ETL api2 is not running"
-        )
-
-    pid = etl.get("pid")
-    if not pid:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="ETL running but PID not found"
-        )
-
-    try:
-        os.killpg(pid, signal.SIGTERM)  # kill
-        logger.warning("ETL api2 cancelled (SIGTERM) pid=%s", pid)
-    except ProcessLookupError:
-        logger.warning("ETL api2 pid=%s not found", pid)
-    except PermissionError:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="No permission to kill this process"
+            detail=f"ETL {api} is not running"
         )
 
-    await results.update_one(
-        {"_id": name_etl_log},
-        {"$set": {
-            "status": "cancelled",
-            "finished_at": datetime.utcnow(),
-            "error": "Cancelled by admin"
-        }}
-    )
-
-    return {
-        "status": "cancelled",
-        "pid": pid
-    }
+    logger.warning("ETL %s %s pid=%s", api, cancelled["status"], cancelled["pid"])
+    return cancelled
 
-@router.post("/admin/etl-api2/run", status_code=202)
-async def run_sh_and_load(current_user: dict = Depends(auth.get_current_user)):
-    if current_user["role"] != "role_admin":
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Admin only"
-        )
-
-    name_etl_log = "etl_api2"
-    results = db_manager.db.results_etl
-
-    # avoid two ETL at the same time
-    running = await results.find_one({
-        "_id": name_etl_log,
-        "status": "running"
-    })
-
-    if running:
-        raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail="ETL api2 is already running by you or other user"
-        )
-
-    # launch process
-    process = await asyncio.create_subprocess_exec(
-        "python3", "-m", "etl.pipelines.openfoodfacts_pipeline",
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.STDOUT,
-        start_new_session=True
-    )
+@router.post("/admin/etl-{api}/run", status_code=202)
+async def run_etl(api: str, current_user: dict = Depends(auth.get_current_user)):
+    pipeline = admin_pipeline(api, current_user)
 
-
-    # save initial state
-    await results.update_one(
-        {"_id": name_etl_log},
-        {"$set": {
-            "status": "running",
-            "started_at": datetime.utcnow(),
-            "finished_at": None,
-            "pid": process.pid,
-            "error": None
-        }},
-        upsert=True
-    )
-
-    #launch a watcher when the scrap ends launch de loader
-    logger = logging.getLogger(name_etl_log)
-
-    #final output
-    timestamp = datetime.utcnow()
-    logger_output = logging.getLogger(f"etl_api2_{timestamp}")
-
-    asyncio.create_task(
-        watch_process_load(process, name_etl_log, db_manager, logger, logger_output)
-    )
+    # queued, or started right away when its slots are free; a request
+    # while one is already waiting joins that job
+    job = await etl_job_manager.submit(pipeline, current_user["username"])
 
     return {
         "status": "accepted",
-        "message": "ETL api2 started",
-        "pid": process.pid
+        "job_status": job["status"],
+        "message": f"ETL {api} {'started' if job['status'] == 'running' else job['status']}",
+        "pid": job.get("pid")
     }
 
-@router.get("/admin/etl-api2/status")
-async def get_etl_status(current_user: dict = Depends(auth.get_current_user)):
-    if current_user["role"] != "role_admin":
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Admin only"
-        )
+@router.get("/admin/etl-{api}/status")
+async def get_etl_status(api: str, current_user: dict = Depends(auth.get_current_user)):
+    pipeline = admin_pipeline(api, current_user)
 
-    logs = db_manager.db.results_etl
-    etl_name = "etl_api2"
+    queued = await etl_job_manager.status(pipeline)
+    if queued is not None:
+        return queued
 
-    status_doc = await logs.find_one({"_id": etl_name})
+    status_doc = await db_manager.db.results_etl.find_one({"_id": get_pipelines()[pipeline]["name"]})
 
     if not status_doc:
         return {
@@ -486,53 +305,38 @@ async def get_etl_status(current_user: dict = Depends(auth.get_current_user)):
         "error": status_doc.get("error")
     }
 
-@router.get("/admin/etl-api2/results")
-async def get_last_etl_result(current_user: dict = Depends(auth.get_current_user)):
-    if current_user["role"] != "role_admin":
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Admin only"
-        )
+@router.get("/admin/etl-{api}/results")
+async def get_last_etl_result(api: str, current_user: dict = Depends(auth.get_current_user)):
+    pipeline = admin_pipeline(api, current_user)
 
-    logs = db_manager.db.logs
-    etl_prefix = "etl_api2_"
+    # last finished run in the ledger
+    run = await last_finished_run(db_manager.db, pipeline)
 
-    # last log with etl_api2_
-    last_log = await logs.find_one(
-        {"logger": {"$regex": f"^{etl_prefix}"}},
-        sort=[("timestamp", -1)],
-        projection={"_id": 0, "message": 1}
-    )
-
-    if not last_log:
+    if not run:
         return {"message": "Never has been run an ETL"}
 
-    return {"message": last_log["message"]}
-
-@router.get("/admin/etl-api2/history")
-async def get_etl_history(current_user: dict = Depends(auth.get_current_user)):
-    if current_user["role"] != "role_admin":
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Admin only"
-        )
-
-    logs = db_manager.db.logs
-    etl_prefix = "etl_api2_"
-
-    cursor = logs.find(
-        {"logger": {"$regex": f"^{etl_prefix}"}},
-        projection={"_id": 0, "message": 1}
-    ).sort("timestamp", -1)
+    message = run["result"] or f"[{run['started_at']}] {run['status']}"
+    return {"message": message, "run": run}
 
-    all_logs = await cursor.to_list(length=None)
-
-    messages = [log["message"] for log in all_logs]
+@router.get("/admin/etl-{api}/history")
+async def get_etl_history(
+    api: str,
+    limit: int = Query(20, ge=1, le=100, description="Runs per page (max 100)"),
+    cursor: str | None = Query(None, description="next_cursor of the previous page"),
+    current_user: dict = Depends(auth.get_current_user)
+):
+    pipeline = admin_pipeline(api, current_user)
+    return await etl_history_page(db_manager.db, pipeline, limit, cursor)
 
-    if not messages:
-        messages = ["Never has been run an ETL"]
+@router.get("/admin/etl-jobs/stats")
+async def get_etl_job_stats(current_user: dict = Depends(auth.get_current_user)):
+    """
+    Queue and concurrency of the ETL jobs
+    """
+    if current_user["role"] != "role_admin":
+        raise HTTPException(status_code=403, detail="Admin only")
 
-    return {"messages": messages}
+    return await etl_job_manager.stats()
 
 # ------------------------------------------------------------
 
@@ -569,6 +373,7 @@ async def update_user(user_id: str, user: schemas.UserCreate, current_user: dict
         {"$set": update_data},
         return_document=True
     )
+    auth.invalidate_user(ObjectId(user_id))
     if not result:
         raise HTTPException(status_code=404, detail="User not found")
     return result
@@ -585,11 +390,75 @@ async def admin_delete_user(
     result = await db_manager.db["users"].delete_one(
         {"_id": ObjectId(user_id)}
     )
+    auth.invalidate_user(ObjectId(user_id))
 
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
 
 
+@router.get("/admin/cache/stats")
+async def get_cache_stats(current_user: dict = Depends(auth.get_current_user)):
+    """
+    Hit, miss and eviction counters of the result caches
+    """
+    if current_user["role"] != "role_admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+
+    return {
+        "dataset_version": dataset_version.version,
+        "caches": [meal_cache.stats(), user_cache.stats(), collection_stats_cache.stats()]
+    }
+
+
+@router.get("/admin/logs/stats")
+async def get_log_sink_stats(current_user: dict = Depends(auth.get_current_user)):
+    """
+    Counters of the batched Mongo log sink and the retention in use
+    """
+    if current_user["role"] != "role_admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+
+    return {
+        **mongo_log_handler.stats(),
+        "storage_mode": LOG_STORAGE_MODE,
+        "retention_days": RETENTION_POLICIES,
+        "live_tails": log_stream.stats()
+    }
+
+
+async def collection_stats(coll_name: str) -> dict:
+    """
+    Metadata-only probe of a collection: estimated count (no scan), one
+    sample document and storage / index sizes from $collStats.
+    """
+    coll = db_manager.db[coll_name]
+
+    count = await coll.estimated_document_count()
+
+    # Get sample document to show structure
+    sample = await coll.find_one()
+    sample_fields = list(sample.keys())[:5] if sample else []
+
+    storage = {}
+    try:
+        stats = await coll.aggregate([{"$collStats": {"storageStats": {}}}]).to_list(length=1)
+        storage = stats[0].get("storageStats", {}) if stats else {}
+    except Exception:
+        # $collStats may not be allowed (shared clusters), sizes stay empty
+        pass
+
+    return {
+        "name": coll_name,
+        "document_count": count,
+        "sample_fields": sample_fields[:3],  # First 3 fields
+        "has_id_field": "_id" in sample if sample else False,
+        "size_bytes": storage.get("size"),
+        "storage_size_bytes": storage.get("storageSize"),
+        "total_index_size_bytes": storage.get("totalIndexSize"),
+        "index_sizes": storage.get("indexSizes", {})
+    }
+
+
 @router.get("/admin/collections")
 async def list_collections(current_user: dict = Depends(auth.get_current_user)):
     """
@@ -597,48 +466,110 @@ async def list_collections(current_user: dict = Depends(auth.get_current_user)):
     """
     if current_user["role"] != "role_admin":
         raise HTTPException(status_code=403, detail="Admin only")
+
+    cached = collection_stats_cache.get(db_manager.db.name)
+    if cached is not None:
+        return cached
     
     try:
         collections = await db_manager.db.list_collection_names()
         
-        # Get basic info for each collection
-        collections_info = []
-        for coll_name in collections:
-            try:
-                coll = db_manager.db[coll_name]
-                count = await coll.count_documents({})
-                
-                # Get sample document to show structure
-                sample = await coll.find_one()
-                sample_fields = list(sample.keys())[:5] if sample else []
-                
-                collections_info.append({
-                    "name": coll_name,
-                    "document_count": count,
-                    "sample_fields": sample_fields[:3],  # First 3 fields
-                    "has_id_field": "_id" in sample if sample else False
-                })
-            except Exception as coll_error:
-                # Skip problematic collections
-                continue
+        # Get basic info for each collection, all probes at the same time
+        probes = await gather_bounded(
+            [lambda name=name: collection_stats(name) for name in collections],
+            return_exceptions=True
+        )
+        # Skip problematic collections
+        collections_info = [p for p in probes if not isinstance(p, BaseException)]
+        collections_info.sort(key=lambda c: c["name"])
         
-        return {
+        result = {
             "database": db_manager.db.name,
             "total_collections": len(collections_info),
             "collections": collections_info
         }
+        collection_stats_cache.set(db_manager.db.name, result)
+        return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
+@router.get("/admin/indexes/check")
+async def check_query_indexes(current_user: dict = Depends(auth.get_current_user)):
+    """
+    Winning plan of each route's canonical query, flags any COLLSCAN
+    and any unbounded index scan
+    """
+    if current_user["role"] != "role_admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+
+    report = await check_indexes(db_manager.db)
+    return {
+        "collscans": sum(r["collscan"] for r in report),
+        "unbounded_scans": sum(r["unbounded"] for r in report),
+        "queries": report
+    }
+
+def _filter_value(raw: str):
+    # "52772" may be stored as a string or as a number, match both
+    values = [raw]
+    for cast in (int, float):
+        try:
+            values.append(cast(raw))
+            break
+        except ValueError:
+            pass
+    return values[0] if len(values) == 1 else {"$in": values}
+
+
+async def _collection_query(collection, filters: list[str]) -> dict:
+    """
+    Equality filters "field:value", only on fields of an index followed by
+    _id, e.g. (mealID, _id): the page is then read in _id order along the
+    index, a deep filtered page costs the same as the first one.
+    """
+    if not filters:
+        return {}
+
+    # sets of fields an index has right before its _id key
+    filterable = set()
+    for spec in (await collection.index_information()).values():
+        keys = [k for k, _ in spec["key"]]
+        if keys[0] == "_id":
+            filterable.add(frozenset(["_id"]))
+        elif "_id" in keys:
+            filterable.add(frozenset(keys[:keys.index("_id")]))
+
+    query = {}
+    for f in filters:
+        field, sep, raw = f.partition(":")
+        if not sep or not field:
+            raise HTTPException(status_code=400, detail=f"Invalid filter '{f}', expected field:value")
+        query[field] = _filter_value(raw)
+
+    if frozenset(query) not in filterable:
+        raise HTTPException(
+            status_code=400,
+            detail=f"No ({', '.join(query)}, _id) index, filterable fields: "
+                   f"{sorted(', '.join(sorted(s)) for s in filterable)}"
+        )
+    return query
+
+
 @router.get("/admin/collection/{collection_name}")
 async def get_collection_data(
     collection_name: str,
-    page: int = Query(1, ge=1, description="Page number"),
+    page: int = Query(1, ge=1, description="Page number, only used to skip when no cursor is given"),
     limit: int = Query(10, ge=1, le=100, description="Items per page (max 100)"),
+    cursor: str | None = Query(None, description="next_cursor of the previous page"),
+    fields: str | None = Query(None, description="Comma separated fields to return"),
+    filter: list[str] = Query([], description="Equality filter field:value on an indexed field, repeatable"),
     current_user: dict = Depends(auth.get_current_user)
 ):
     """
-    Get paginated data from a collection
+    Get paginated data from a collection, ordered by _id. Pages after the
+    first are fetched with the cursor of the previous one (_id > last _id),
+    so a deep page costs the same as page 1. The totals are the estimated
+    size of the whole collection, filters are not applied to them.
     """
     if current_user["role"] != "role_admin":
         raise HTTPException(status_code=403, detail="Admin only")
@@ -649,14 +580,28 @@ async def get_collection_data(
             raise HTTPException(status_code=404, detail=f"Collection '{collection_name}' not found")
         
         collection = db_manager.db[collection_name]
-        
-        # Calculate pagination
-        skip = (page - 1) * limit
-        total = await collection.count_documents({})
-        
-        # Get data with pagination
-        cursor = collection.find().skip(skip).limit(limit)
-        documents = await cursor.to_list(length=limit)
+
+        query = await _collection_query(collection, filter)
+        if cursor is not None:
+            query["_id"] = {"$gt": decode_cursor(cursor)}
+
+        projection = None
+        if fields:
+            projection = {f.strip(): 1 for f in fields.split(",") if f.strip()}
+
+        # metadata count, exact totals of a filter would mean reading it all
+        total = await collection.estimated_document_count()
+        total_pages = max((total + limit - 1) // limit, 1)
+
+        # one extra document tells whether there is a next page
+        find = collection.find(query, projection=projection).sort("_id", 1)
+        if cursor is None and page > 1:
+            find = find.skip((page - 1) * limit)
+        documents = await find.limit(limit + 1).to_list(length=limit + 1)
+
+        has_next_page = len(documents) > limit
+        documents = documents[:limit]
+        next_cursor = encode_cursor(documents[-1]["_id"]) if has_next_page else None
         
         # Convert ObjectId to string for JSON
         for doc in documents:
@@ -668,9 +613,13 @@ async def get_collection_data(
             "page": page,
             "limit": limit,
             "total_documents": total,
-            "total_pages": (total + limit - 1) // limit,
-            "has_next_page": page < ((total + limit - 1) // limit),
+            "total_pages": total_pages,
+            "total_is_estimate": True,
+            # totals count the whole collection, not the filtered documents
+            "total_is_filtered": False,
+            "has_next_page": has_next_page,
             "has_prev_page": page > 1,
+            "next_cursor": next_cursor,
             "documents": documents
         }
     except HTTPException:
@@ -1,17 +1,26 @@
 from fastapi import APIRouter, Depends, HTTPException
+import asyncio
 from database import db_manager
 import utils.auth as auth
-from utils.meal_functions import calculate_meal_from_docs
+from utils.cache import meal_cache, read_through_many
+from utils.meal_functions import calculate_meals
+from utils.concurrency import FANOUT_TIMEOUT
 
 router = APIRouter(prefix="/versus", tags=["Versus"])
 
 
-async def calculate_meal(meal_id: int) -> dict | None:
-    meals_col = db_manager.db["themealdb_clean"]
-    products_col = db_manager.db["openfoodfacts_clean"]
-    print(meal_id)
-    docs = await meals_col.find({"mealID": meal_id}).to_list(1000)
-    return await calculate_meal_from_docs(docs, products_col)
+async def calculate_pair(meal1_id: int, meal2_id: int) -> tuple:
+    # each meal is cached on its own, the misses go in one batch: one
+    # query for the rows, one for the products
+    meals = await read_through_many(
+        meal_cache, "versus.meal", [meal1_id, meal2_id],
+        lambda ids: calculate_meals(
+            ids,
+            db_manager.db["themealdb_clean"],
+            db_manager.db["openfoodfacts_clean"]
+        )
+    )
+    return meals[meal1_id], meals[meal2_id]
 
 
 @router.get("/compare")
@@ -20,8 +29,13 @@ async def compare_meals(
     meal2_id: int,
     current_user: dict = Depends(auth.get_current_user)
 ):
-    meal1 = await calculate_meal(meal1_id)
-    meal2 = await calculate_meal(meal2_id)
+    try:
+        meal1, meal2 = await asyncio.wait_for(
+            calculate_pair(meal1_id, meal2_id),
+            FANOUT_TIMEOUT
+        )
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Meal calculation timed out")
 
     if not meal1 or not meal2:
         raise HTTPException(status_code=404, detail="Meal not found or no valid ingredients")
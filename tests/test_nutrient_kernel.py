@@ -0,0 +1,97 @@
+import random
+
+import numpy as np
+
+from utils.meal_functions import _meals_from_docs, _sum_nutrients, calculate_meal_nutriscore
+from utils.nutrient_kernel import NUTRIENT_KEYS, PRODUCT_KEYS, meal_totals_and_scores
+
+
+def scalar_meal(docs, products):
+    totals, used = _sum_nutrients(docs, products)
+    return totals, calculate_meal_nutriscore(totals), used
+
+
+def meal_docs(meal_id, ingredients):
+    return [
+        {
+            "mealID": meal_id,
+            "name": f"Meal {meal_id}",
+            "country": "es",
+            "imageURL": "",
+            "ingredient": name,
+            "measure": measure
+        }
+        for name, measure in ingredients
+    ]
+
+
+def test_kernel_matches_scalar_functions():
+    rng = random.Random(0)
+    n_meals = 500
+    rows, grams, index = [], [], []
+    for m in range(n_meals):
+        for _ in range(rng.randint(1, 15)):
+            rows.append([rng.choice([0, rng.uniform(0, 900)]) for _ in NUTRIENT_KEYS])
+            grams.append(rng.uniform(1, 500))
+            index.append(m)
+
+    totals, scores, used = meal_totals_and_scores(
+        np.array(rows), np.array(grams), np.array(index), n_meals
+    )
+
+    for m in range(n_meals):
+        docs, products = [], {}
+        for i, (row, g) in enumerate(zip(rows, grams)):
+            if index[i] != m:
+                continue
+            name = f"ing{i}"
+            docs.append({"ingredient": name, "measure": g})
+            products[name] = dict(zip(PRODUCT_KEYS, row))
+
+        expected, score, n_used = scalar_meal(docs, products)
+        assert totals[m].tolist() == [expected[k] for k in NUTRIENT_KEYS]
+        assert scores[m] == score
+        assert used[m] == n_used
+
+
+def test_meals_from_docs_edge_cases():
+    products = {
+        "rice": {"energy_kcal_100g": 130, "fat_100g": 0.3, "carbohydrates_100g": 28,
+                 "proteins_100g": 2.7, "salt_100g": 0.01},
+        # missing and null nutrients count as 0
+        "egg": {"energy_kcal_100g": 155, "proteins_100g": None},
+        "water": {"salt_100g": None}
+    }
+    docs_by_meal = {
+        1: meal_docs(1, [("Rice", "200g"), ("Egg", "50 g"), ("Salt", "5g")]),
+        # zero grams and no measure are skipped
+        2: meal_docs(2, [("Rice", "0g"), ("Egg", None), ("Water", "250ml")]),
+        # no matched products: left out
+        3: meal_docs(3, [("Saffron", "1g"), ("Rice", "a pinch")])
+    }
+
+    meals = _meals_from_docs(docs_by_meal, products)
+    assert set(meals) == {1, 2}
+
+    for meal_id, meal in meals.items():
+        totals, score, used = scalar_meal(docs_by_meal[meal_id], products)
+        assert meal["nutrients"] == {k: round(v, 2) for k, v in totals.items()}
+        assert meal["nutriscore"] == score
+        assert meal["ingredients_used"] == used
+
+    assert meals[1]["ingredients_used"] == 2
+    assert meals[2]["ingredients_used"] == 1
+    assert meals[2]["nutrients"] == dict.fromkeys(NUTRIENT_KEYS, 0.0)
+    assert meals[2]["nutriscore"] == calculate_meal_nutriscore({})
+
+
+def test_no_matched_products():
+    assert _meals_from_docs({1: meal_docs(1, [("Saffron", "1g")])}, {}) == {}
+    assert _meals_from_docs({}, {}) == {}
+
+    totals, scores, used = meal_totals_and_scores(
+        np.empty((0, len(NUTRIENT_KEYS))), np.empty(0), np.empty(0, dtype=np.int64), 2
+    )
+    assert totals.tolist() == [[0.0] * len(NUTRIENT_KEYS)] * 2
+    assert used.tolist() == [0, 0]
+    assert scores.tolist() == [calculate_meal_nutriscore({})] * 2
@@ -8,6 +8,10 @@ from fastapi.security import OAuth2PasswordBearer
 from fastapi import Depends, HTTPException, status
 import schemas, database
 import logging
+import copy
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from utils.cache import user_cache
 
 # --- CONFIGURATION ---
 load_dotenv()
@@ -17,9 +21,18 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt cost, hashes with a different cost are upgraded on the next login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+# bcrypt runs off the event loop in a small pool, with a bounded backlog
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", 4))
+HASH_QUEUE_LIMIT = int(os.getenv("HASH_QUEUE_LIMIT", 64))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+_hash_executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="pwd-hash")
+_hash_pending = 0
+
 # --- UTILITY FUNCTIONS ---
 
 def verify_password(plain_password, hashed_password):
@@ -28,6 +41,36 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+async def _run_hashing(func, *args):
+    """
+    Runs a bcrypt call in the hashing pool. When too many are already
+    waiting it fails fast with 503 instead of queueing without limit.
+    """
+    global _hash_pending
+    if _hash_pending >= HASH_QUEUE_LIMIT:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many authentication requests, try again later",
+            headers={"Retry-After": "1"},
+        )
+
+    _hash_pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_hash_executor, func, *args)
+    finally:
+        _hash_pending -= 1
+
+async def get_password_hash_async(password):
+    return await _run_hashing(pwd_context.hash, password)
+
+async def verify_and_update_password_async(plain_password, hashed_password):
+    """
+    (valid, new_hash): new_hash is set when the stored hash was made with
+    another bcrypt cost and should be replaced.
+    """
+    return await _run_hashing(pwd_context.verify_and_update, plain_password, hashed_password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -67,6 +110,13 @@ def verify_refresh_token(token: str):
     except JWTError:
         raise credentials_exception
 
+def invalidate_user(user_id):
+    """
+    Drops a user from the authenticated-user cache after it is
+    updated or deleted, so the change applies on the next request.
+    """
+    user_cache.delete_where(lambda u: u.get("_id") == user_id)
+
 # --- DEPENDENCIES ---
 
 async def get_current_user(token: str = Depends(oauth2_scheme), db = Depends(database.get_db)):
@@ -90,11 +140,18 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db = Depends(dat
         logger.warning(f"Token validation failed: {str(e)}")
         raise credentials_exception
     
+    # Recently seen users are served from memory (short TTL)
+    user = user_cache.get(token_data.username)
+    if user is not None:
+        return copy.deepcopy(user)
+
     # Async MongoDB call
     user = await db["users"].find_one({"username": token_data.username})
     
     if user is None:
         raise credentials_exception
+
+    user_cache.set(token_data.username, copy.deepcopy(user))
     
     # Convert raw Mongo dict to a Schema for consistent typing, though returning dict works too
     return user
\ No newline at end of file
@@ -0,0 +1,185 @@
+import copy
+import functools
+import os
+import time
+from collections import OrderedDict
+
+DATASET_VERSION_COLLECTION = "dataset_version"
+_DATASET_ID = "dataset"
+
+_MISSING = object()
+
+
+# ============================
+# DATASET VERSION
+# ============================
+class DatasetVersion:
+    """
+    Version of the loaded data, part of every cache key. It is bumped in
+    Mongo after each load (mongo/service.py) and polled by the API, so
+    results calculated with older data are never served again.
+    """
+    version: int = 0
+
+
+dataset_version = DatasetVersion()
+
+
+async def bump_dataset_version(db) -> int:
+    doc = await db[DATASET_VERSION_COLLECTION].find_one_and_update(
+        {"_id": _DATASET_ID},
+        {"$inc": {"version": 1}},
+        upsert=True,
+        return_document=True
+    )
+    dataset_version.version = doc["version"]
+    return dataset_version.version
+
+
+async def read_dataset_version(db) -> int:
+    doc = await db[DATASET_VERSION_COLLECTION].find_one({"_id": _DATASET_ID})
+    return doc["version"] if doc else 0
+
+
+async def sync_dataset_version(db, reload=None) -> bool:
+    """
+    Reads the current version from Mongo, True if it changed. `reload`
+    (async, no arguments) runs before the new version is adopted, so
+    nothing is cached under it while the old data is still in memory.
+    """
+    version = await read_dataset_version(db)
+    if version == dataset_version.version:
+        return False
+    if reload is not None:
+        await reload()
+    dataset_version.version = version
+    return True
+
+
+# ============================
+# LRU + TTL CACHE
+# ============================
+class ResultCache:
+    """
+    LRU cache bounded by size and by time to live, with counters.
+    """
+
+    def __init__(self, name: str, maxsize: int = 1024, ttl: float = 600):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.evictions += 1
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key):
+        self._data.pop(key, None)
+
+    def delete_where(self, predicate):
+        # drops every entry whose value matches, for invalidation by content
+        for key in [k for k, (_, v) in self._data.items() if predicate(v)]:
+            del self._data[key]
+
+    def clear(self):
+        self._data.clear()
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+
+meal_cache = ResultCache(
+    "meals",
+    maxsize=int(os.getenv("RESULT_CACHE_SIZE", 2048)),
+    ttl=float(os.getenv("RESULT_CACHE_TTL", 600))
+)
+
+
+user_cache = ResultCache(
+    "users",
+    maxsize=int(os.getenv("USER_CACHE_SIZE", 1024)),
+    ttl=float(os.getenv("USER_CACHE_TTL", 30))
+)
+
+
+def read_through(cache: ResultCache, key=None):
+    """
+    Decorator for async functions: results (None included) are cached
+    under (function, dataset version, key). `key` builds the key from the
+    call arguments, by default the positional arguments themselves.
+    Callers get a copy, cached values are never shared.
+    """
+    def decorator(func):
+        name = f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            call_key = key(*args, **kwargs) if key else args
+            cache_key = (name, dataset_version.version, call_key)
+
+            value = cache.get(cache_key, _MISSING)
+            if value is _MISSING:
+                value = await func(*args, **kwargs)
+                cache.set(cache_key, value)
+
+            return copy.deepcopy(value)
+
+        return wrapper
+    return decorator
+
+
+async def read_through_many(cache: ResultCache, name: str, ids, compute) -> dict:
+    """
+    id -> value, each id cached on its own under (name, dataset version,
+    id). Only the misses are computed, all in one `compute(missing_ids)`
+    call returning id -> value; ids it leaves out are cached as None.
+    Callers get copies, as with read_through.
+    """
+    version = dataset_version.version
+    values, missing = {}, []
+    for id_ in dict.fromkeys(ids):
+        value = cache.get((name, version, id_), _MISSING)
+        if value is _MISSING:
+            missing.append(id_)
+        else:
+            values[id_] = value
+
+    if missing:
+        computed = await compute(missing)
+        for id_ in missing:
+            values[id_] = computed.get(id_)
+            cache.set((name, version, id_), values[id_])
+
+    return copy.deepcopy(values)
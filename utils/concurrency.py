@@ -0,0 +1,34 @@
+import asyncio
+import os
+import database
+
+# Concurrent tasks a single request may run against Mongo. Kept well below
+# the Motor pool size so one request cannot take every connection.
+FANOUT_LIMIT = max(1, min(
+    int(os.getenv("FANOUT_LIMIT", 8)),
+    database.MONGO_MAX_POOL_SIZE // 4
+))
+FANOUT_TIMEOUT = float(os.getenv("FANOUT_TIMEOUT", 10))
+
+
+async def gather_bounded(
+    funcs,
+    limit: int = FANOUT_LIMIT,
+    timeout: float | None = FANOUT_TIMEOUT,
+    return_exceptions: bool = False
+) -> list:
+    """
+    Runs the given zero-argument coroutine functions concurrently, at most
+    `limit` at a time, each one cancelled after `timeout` seconds
+    (asyncio.TimeoutError). Results keep the order of `funcs`.
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(func):
+        async with semaphore:
+            return await asyncio.wait_for(func(), timeout)
+
+    return await asyncio.gather(
+        *(run(f) for f in funcs),
+        return_exceptions=return_exceptions
+    )
@@ -0,0 +1,473 @@
+import asyncio
+import logging
+import os
+import signal
+import socket
+from datetime import datetime, timedelta
+from pymongo import ASCENDING, DESCENDING, IndexModel, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+import database
+from etl.utils.config_loader import Config
+from utils.etl_runs import ACTIVE_RUN_STATUSES, start_run, finish_run, mark_cancelling
+from utils.process_manager import watch_process_load
+
+ETL_JOBS_COLLECTION = "etl_jobs"
+ETL_SLOTS_COLLECTION = "etl_slots"
+
+# one id per API worker, claims and leases are owned by it
+NODE_ID = os.getenv("NODE_ID") or f"{socket.gethostname()}:{os.getpid()}"
+
+_jobs_config = Config.get_jobs_config()
+JOBS_MAX_CONCURRENT = int(os.getenv("ETL_MAX_CONCURRENT", _jobs_config.get("max_concurrent", 2)))
+JOB_LEASE_SECONDS = float(os.getenv("ETL_JOB_LEASE_SECONDS", _jobs_config.get("lease_seconds", 60)))
+JOB_HEARTBEAT_SECONDS = float(os.getenv("ETL_JOB_HEARTBEAT_SECONDS", _jobs_config.get("heartbeat_seconds", 15)))
+JOB_POLL_INTERVAL = float(os.getenv("ETL_JOB_POLL_INTERVAL", 10))
+
+ETL_JOBS_INDEXES = [
+    IndexModel([("status", ASCENDING), ("requested_at", ASCENDING)]),
+    IndexModel([("pipeline", ASCENDING), ("requested_at", DESCENDING)]),
+    # at most one waiting job per pipeline, extra requests join it
+    IndexModel(
+        [("pipeline", ASCENDING)],
+        name="one_queued_per_pipeline",
+        unique=True,
+        partialFilterExpression={"status": "queued"}
+    ),
+]
+
+_GLOBAL_SLOT = "global"
+
+
+# ============================
+# PIPELINES (etl/config.yaml)
+# ============================
+def get_pipelines() -> dict:
+    """
+    Enabled pipelines that can run as jobs: key -> job name, module and
+    its own concurrency limit.
+    """
+    return {
+        key: {
+            "name": api.get("job_name", f"etl_{key}"),
+            "module": api["pipeline"],
+            "max_concurrent": int(api.get("max_concurrent", 1))
+        }
+        for key, api in Config.get_apis().items()
+        if api.get("pipeline")
+    }
+
+
+def resolve_pipeline(api: str) -> str | None:
+    """
+    "api1" (from /admin/etl-api1/...), "etl_api1" or "themealdb" -> "themealdb"
+    """
+    for key, p in get_pipelines().items():
+        if api in (key, p["name"], p["name"].removeprefix("etl_")):
+            return key
+    return None
+
+
+# ============================
+# SLOTS: CONCURRENCY LIMITS
+# ============================
+# One document per scope (global, pipeline:<key>) holding the jobs that
+# run under it. Taking a slot is a single conditional update, so workers
+# on several nodes can't go over the limit. A holder whose lease is not
+# renewed (its node died) is dropped on the next acquire, unless it is a
+# job still running on the acquiring worker (`alive`).
+def _lease() -> datetime:
+    return datetime.utcnow() + timedelta(seconds=JOB_LEASE_SECONDS)
+
+
+async def acquire_slot(db, scope: str, limit: int, job_id: str, alive=()) -> bool:
+    slots = db[ETL_SLOTS_COLLECTION]
+    await slots.update_one(
+        {"_id": scope},
+        {"$pull": {"holders": {
+            "lease_until": {"$lt": datetime.utcnow()},
+            "job": {"$nin": list(alive)}
+        }}}
+    )
+    try:
+        await slots.find_one_and_update(
+            {
+                "_id": scope,
+                f"holders.{limit - 1}": {"$exists": False},
+                "holders.job": {"$ne": job_id}
+            },
+            {"$push": {"holders": {"job": job_id, "node": NODE_ID, "lease_until": _lease()}}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        # the scope exists and is full (or already holds this job)
+        return False
+    return True
+
+
+async def renew_slot(db, scope: str, job_id: str):
+    await db[ETL_SLOTS_COLLECTION].update_one(
+        {"_id": scope, "holders": {"$elemMatch": {"job": job_id, "node": NODE_ID}}},
+        {"$set": {"holders.$.lease_until": _lease()}}
+    )
+
+
+async def release_slot(db, scope: str, job_id: str):
+    await db[ETL_SLOTS_COLLECTION].update_one(
+        {"_id": scope},
+        {"$pull": {"holders": {"job": job_id, "node": NODE_ID}}}
+    )
+
+
+# ============================
+# JOB MANAGER
+# ============================
+class ETLJobManager:
+    """
+    Runs the ETL pipelines as jobs stored in etl_jobs:
+    queued -> running [-> cancelling] -> finished | error | cancelled.
+
+    A run request queues a job (joining the one already waiting for that
+    pipeline, if any). Every worker dispatches the queue in FIFO order:
+    it takes a pipeline slot and a global slot, then claims the job with
+    a conditional update, so only one node starts it. While the process
+    runs its owner renews the lease every JOB_HEARTBEAT_SECONDS. Jobs whose
+    lease expires are given up by whichever worker sees them. A cancelled
+    job stays "cancelling", holding its slots, until its owner has killed
+    the process.
+    """
+
+    def __init__(self):
+        self._task = None
+        self._wakeup = None
+        # job_id -> subprocess started by this worker
+        self._processes = {}
+        # watcher tasks, referenced until they end: they release the slots
+        self._watchers = set()
+
+    @property
+    def db(self):
+        return database.db_manager.db
+
+    # ---------- requests ----------
+    async def submit(self, pipeline: str, requested_by: str) -> dict:
+        jobs = self.db[ETL_JOBS_COLLECTION]
+        now = datetime.utcnow()
+
+        try:
+            job = await jobs.find_one_and_update(
+                {"pipeline": pipeline, "status": "queued"},
+                {"$setOnInsert": {
+                    "pipeline": pipeline,
+                    "name": get_pipelines()[pipeline]["name"],
+                    "status": "queued",
+                    "requested_by": requested_by,
+                    "requested_at": now
+                }},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # another worker queued it at the same moment
+            job = await jobs.find_one({"pipeline": pipeline, "status": "queued"})
+
+        await self.dispatch()
+        return await jobs.find_one({"_id": job["_id"]})
+
+    async def cancel(self, pipeline: str) -> dict | None:
+        """
+        Drops the waiting job and asks the owner of the running one to stop
+        it. None when there was nothing to cancel.
+        """
+        jobs = self.db[ETL_JOBS_COLLECTION]
+        now = datetime.utcnow()
+
+        dropped = await jobs.update_many(
+            {"pipeline": pipeline, "status": "queued"},
+            {"$set": {"status": "cancelled", "finished_at": now, "error": "Cancelled by admin"}}
+        )
+
+        running = await jobs.find_one_and_update(
+            {"pipeline": pipeline, "status": "running"},
+            {"$set": {"status": "cancelling", "cancel_requested": True}},
+            return_document=ReturnDocument.AFTER
+        )
+        if running is None:
+            cancelling = await jobs.find_one({"pipeline": pipeline, "status": "cancelling"})
+            if cancelling is not None:
+                return {"status": "cancelling", "pid": cancelling.get("pid")}
+            return {"status": "cancelled", "pid": None} if dropped.modified_count else None
+
+        # everything is marked before the kill, so the watcher of the dying
+        # process can't close the run as a failure in between
+        await self.db.results_etl.update_one(
+            {"_id": running["name"], "run_id": running.get("run_id")},
+            {"$set": {"status": "cancelling"}}
+        )
+        if running.get("run_id"):
+            await mark_cancelling(self.db, running["run_id"])
+
+        # the owner kills it now if it is this worker, else on its heartbeat;
+        # slots and the final status wait until the process is gone (_watch)
+        process = self._processes.get(str(running["_id"]))
+        if process is not None:
+            self._kill(process)
+
+        return {"status": "cancelling", "pid": running.get("pid")}
+
+    async def status(self, pipeline: str) -> dict | None:
+        """
+        The waiting job of a pipeline and its place in the queue, if any.
+        """
+        jobs = self.db[ETL_JOBS_COLLECTION]
+        job = await jobs.find_one({"pipeline": pipeline, "status": "queued"})
+        if job is None:
+            return None
+
+        ahead = await jobs.count_documents(
+            {"status": "queued", "requested_at": {"$lt": job["requested_at"]}}
+        )
+        return {
+            "status": "queued",
+            "requested_at": job["requested_at"],
+            "position": ahead + 1
+        }
+
+    # ---------- dispatch ----------
+    async def dispatch(self):
+        await self._reap_expired()
+
+        queued = await (
+            self.db[ETL_JOBS_COLLECTION]
+            .find({"status": "queued"})
+            .sort("requested_at", ASCENDING)
+            .to_list(length=100)
+        )
+        for job in queued:
+            await self._try_start(job)
+
+    async def _try_start(self, job: dict) -> bool:
+        jobs = self.db[ETL_JOBS_COLLECTION]
+        logger = logging.getLogger(__name__)
+
+        pipeline = get_pipelines().get(job["pipeline"])
+        if pipeline is None:
+            await jobs.update_one(
+                {"_id": job["_id"], "status": "queued"},
+                {"$set": {"status": "error", "error": "Pipeline not enabled in etl/config.yaml"}}
+            )
+            return False
+
+        job_id = str(job["_id"])
+        pipeline_slot = f"pipeline:{job['pipeline']}"
+
+        alive = list(self._processes)
+        if not await acquire_slot(self.db, pipeline_slot, pipeline["max_concurrent"], job_id, alive):
+            return False
+        if not await acquire_slot(self.db, _GLOBAL_SLOT, JOBS_MAX_CONCURRENT, job_id, alive):
+            await release_slot(self.db, pipeline_slot, job_id)
+            return False
+
+        claimed = await jobs.find_one_and_update(
+            {"_id": job["_id"], "status": "queued"},
+            {"$set": {
+                "status": "running",
+                "owner": NODE_ID,
+                "started_at": datetime.utcnow(),
+                "lease_until": _lease(),
+                "heartbeat_at": datetime.utcnow()
+            }},
+            return_document=ReturnDocument.AFTER
+        )
+        if claimed is None:
+            # cancelled or claimed by another worker meanwhile
+            await release_slot(self.db, pipeline_slot, job_id)
+            await release_slot(self.db, _GLOBAL_SLOT, job_id)
+            return False
+
+        try:
+            await self._launch(claimed, pipeline)
+        except Exception as e:
+            logger.error(f"ETL job {job_id} ({job['pipeline']}) failed to start: {e}")
+            await jobs.update_one(
+                {"_id": claimed["_id"]},
+                {"$set": {"status": "error", "finished_at": datetime.utcnow(), "error": str(e)}}
+            )
+            await release_slot(self.db, pipeline_slot, job_id)
+            await release_slot(self.db, _GLOBAL_SLOT, job_id)
+            return False
+        return True
+
+    async def _launch(self, job: dict, pipeline: dict):
+        name = pipeline["name"]
+
+        process = await asyncio.create_subprocess_exec(
+            "python3", "-m", pipeline["module"],
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+            start_new_session=True
+        )
+        self._processes[str(job["_id"])] = process
+
+        run_id = f"{name}_{process.pid}_{int(datetime.utcnow().timestamp())}"
+        await self.db[ETL_JOBS_COLLECTION].update_one(
+            {"_id": job["_id"]},
+            {"$set": {"pid": process.pid, "run_id": run_id}}
+        )
+
+        # current state of the ETL, read by /status and /logs
+        await self.db.results_etl.update_one(
+            {"_id": name},
+            {"$set": {
+                "status": "running",
+                "started_at": datetime.utcnow(),
+                "finished_at": None,
+                "pid": process.pid,
+                "run_id": run_id,
+                "error": None
+            }},
+            upsert=True
+        )
+        await start_run(self.db, run_id, name, job["pipeline"], process.pid)
+
+        # final output of the run
+        logger_output = logging.getLogger(f"{name}_{datetime.utcnow()}")
+        watcher = asyncio.create_task(self._watch(job, name, process, logger_output, run_id))
+        self._watchers.add(watcher)
+        watcher.add_done_callback(self._watcher_done)
+
+    def _watcher_done(self, task):
+        self._watchers.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logging.getLogger(__name__).error(f"ETL job watcher failed: {task.exception()!r}")
+
+    async def _watch(self, job: dict, name: str, process, logger_output, run_id: str):
+        job_id = str(job["_id"])
+        heartbeat = asyncio.create_task(self._heartbeat(job, process))
+        try:
+            await watch_process_load(process, name, database.db_manager, logger_output, run_id)
+        finally:
+            heartbeat.cancel()
+            self._processes.pop(job_id, None)
+
+            current = await self.db[ETL_JOBS_COLLECTION].find_one({"_id": job["_id"]})
+            final = await self.db.results_etl.find_one({"_id": name}) or {}
+            status = final.get("status", "error")
+            error = final.get("error")
+            if current and current.get("cancel_requested"):
+                status, error = "cancelled", "Cancelled by admin"
+                # the watcher sees a killed process as a failed one
+                await self.db.results_etl.update_one(
+                    {"_id": name, "run_id": run_id},
+                    {"$set": {"status": status, "finished_at": datetime.utcnow(), "error": error}}
+                )
+                await finish_run(self.db, run_id, status, error=error, from_status=("cancelling",))
+
+            await self.db[ETL_JOBS_COLLECTION].update_one(
+                {"_id": job["_id"], "status": {"$in": list(ACTIVE_RUN_STATUSES)}, "owner": NODE_ID},
+                {"$set": {"status": status, "finished_at": datetime.utcnow(), "error": error}}
+            )
+            await release_slot(self.db, f"pipeline:{job['pipeline']}", job_id)
+            await release_slot(self.db, _GLOBAL_SLOT, job_id)
+            self.wake()
+
+    async def _heartbeat(self, job: dict, process):
+        job_id = str(job["_id"])
+        logger = logging.getLogger(__name__)
+        while True:
+            await asyncio.sleep(JOB_HEARTBEAT_SECONDS)
+            # a failed renewal is retried on the next beat, the lease is
+            # several beats long: stopping here would let the job be reaped
+            # and started again while its process is still alive
+            try:
+                current = await self.db[ETL_JOBS_COLLECTION].find_one_and_update(
+                    {"_id": job["_id"], "owner": NODE_ID},
+                    {"$set": {"lease_until": _lease(), "heartbeat_at": datetime.utcnow()}},
+                    return_document=ReturnDocument.AFTER
+                )
+                await renew_slot(self.db, f"pipeline:{job['pipeline']}", job_id)
+                await renew_slot(self.db, _GLOBAL_SLOT, job_id)
+            except Exception as e:
+                logger.error(f"ETL job {job_id} heartbeat failed: {e}")
+                continue
+
+            # cancelled from another worker
+            if current and current.get("cancel_requested"):
+                self._kill(process)
+
+    async def _reap_expired(self):
+        """
+        Running jobs whose owner stopped renewing the lease (node gone).
+        """
+        jobs = self.db[ETL_JOBS_COLLECTION]
+        now = datetime.utcnow()
+        active = {"$in": list(ACTIVE_RUN_STATUSES)}
+        async for job in jobs.find({"status": active, "lease_until": {"$lt": now}}):
+            # still running here: the heartbeat is late, not the node gone
+            if str(job["_id"]) in self._processes:
+                continue
+            given_up = await jobs.find_one_and_update(
+                {"_id": job["_id"], "status": active, "lease_until": {"$lt": now}},
+                {"$set": {"status": "error", "finished_at": now, "error": "Lease expired"}}
+            )
+            if given_up is None or not job.get("run_id"):
+                continue
+            await self.db.results_etl.update_one(
+                {"_id": job["name"], "run_id": job["run_id"], "status": active},
+                {"$set": {"status": "error", "finished_at": now, "error": "Lease expired"}}
+            )
+            await finish_run(self.db, job["run_id"], "error", error="Lease expired",
+                             from_status=ACTIVE_RUN_STATUSES)
+
+    @staticmethod
+    def _kill(process):
+        try:
+            os.killpg(process.pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+    # ---------- lifecycle ----------
+    def wake(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self):
+        logger = logging.getLogger(__name__)
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), JOB_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.dispatch()
+            except Exception as e:
+                logger.error(f"ETL job dispatch failed: {e}")
+
+    def start(self):
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def stats(self) -> dict:
+        jobs = self.db[ETL_JOBS_COLLECTION]
+        return {
+            "node": NODE_ID,
+            "max_concurrent": JOBS_MAX_CONCURRENT,
+            "running_here": len(self._processes),
+            "queued": await jobs.count_documents({"status": "queued"}),
+            "running": await jobs.count_documents({"status": "running"}),
+            "cancelling": await jobs.count_documents({"status": "cancelling"})
+        }
+
+
+etl_job_manager = ETLJobManager()
@@ -0,0 +1,123 @@
+import json
+from datetime import datetime
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from etl.utils.log_etl import STATS_MARKER
+
+ETL_RUNS_COLLECTION = "etl_runs"
+
+# runs whose process may still be alive
+ACTIVE_RUN_STATUSES = ("running", "cancelling")
+
+ETL_RUNS_INDEXES = [
+    # history pages on (started_at, _id): runs may share a started_at
+    IndexModel([("pipeline", ASCENDING), ("started_at", DESCENDING), ("_id", DESCENDING)]),
+    IndexModel([("started_at", DESCENDING)]),
+]
+
+
+# ============================
+# LEDGER: ONE DOCUMENT PER RUN
+# ============================
+async def start_run(db, run_id: str, name: str, pipeline: str, pid: int):
+    await db[ETL_RUNS_COLLECTION].insert_one({
+        "_id": run_id,
+        "name": name,
+        "pipeline": pipeline,
+        "pid": pid,
+        "status": "running",
+        "started_at": datetime.utcnow(),
+        "finished_at": None,
+        "rows": {"extracted": None, "transformed": None, "loaded": None},
+        "stages": {},
+        "result": None,
+        "error": None
+    })
+
+
+def parse_run_stats(line: str) -> dict | None:
+    """
+    Counters written by log_stats in the ETL subprocess, None for any
+    other output line.
+    """
+    _, marker, payload = line.partition(f"{STATS_MARKER} ")
+    if not marker:
+        return None
+    try:
+        return json.loads(payload)
+    except ValueError:
+        return None
+
+
+async def record_stats(db, run_id: str, stats: dict):
+    update = {}
+    for group in ("rows", "stages"):
+        for key, value in stats.get(group, {}).items():
+            update[f"{group}.{key}"] = value
+    if update:
+        await db[ETL_RUNS_COLLECTION].update_one({"_id": run_id}, {"$set": update})
+
+
+async def mark_cancelling(db, run_id: str):
+    # the owner of the job closes it as cancelled once the process is gone
+    await db[ETL_RUNS_COLLECTION].update_one(
+        {"_id": run_id, "status": "running"},
+        {"$set": {"status": "cancelling"}}
+    )
+
+
+async def finish_run(db, run_id: str, status: str, result: str | None = None,
+                     error: str | None = None, loaded: int | None = None,
+                     load_seconds: float | None = None, from_status=("running",)):
+    """
+    Closes a run whose status is one of `from_status`: a run being
+    cancelled by an admin is only closed by the job owner. Without a
+    result message one is made from the status and the error, so
+    /results always has something to show.
+    """
+    if result is None:
+        result = f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {status}"
+        if error:
+            result += f": {error}"
+
+    update = {
+        "status": status,
+        "finished_at": datetime.utcnow(),
+        "result": result,
+        "error": error
+    }
+    if loaded is not None:
+        update["rows.loaded"] = loaded
+    if load_seconds is not None:
+        update["stages.load"] = round(load_seconds, 3)
+
+    await db[ETL_RUNS_COLLECTION].update_one(
+        {"_id": run_id, "status": {"$in": list(from_status)}},
+        {"$set": update}
+    )
+
+
+async def last_finished_run(db, pipeline: str) -> dict | None:
+    return await db[ETL_RUNS_COLLECTION].find_one(
+        {"pipeline": pipeline, "status": {"$nin": list(ACTIVE_RUN_STATUSES)}},
+        sort=[("started_at", DESCENDING)]
+    )
+
+
+async def run_history(db, pipeline: str, limit: int, before: tuple | None = None) -> list[dict]:
+    """
+    Runs of a pipeline, newest first, after the (started_at, _id) of the
+    last run of the previous page (keyset).
+    """
+    query = {"pipeline": pipeline}
+    if before is not None:
+        started_at, run_id = before
+        query["$or"] = [
+            {"started_at": {"$lt": started_at}},
+            {"started_at": started_at, "_id": {"$lt": run_id}}
+        ]
+    return await (
+        db[ETL_RUNS_COLLECTION].find(query)
+        .sort([("started_at", DESCENDING), ("_id", DESCENDING)])
+        .limit(limit)
+        .to_list(length=limit)
+    )
@@ -0,0 +1,122 @@
+import logging
+from pymongo import DeleteOne, UpdateOne
+from utils.meal_nutrition import iter_calculated_meals
+
+HEALTH_MAP_COLLECTION = "precalculated_health_map"
+_TMP_COLLECTION = f"{HEALTH_MAP_COLLECTION}_tmp"
+
+
+def country_stats_to_docs(country_stats: dict) -> list[dict]:
+    # country_stats: country -> {"sum": total nutriscore, "count": meals}
+    result = [
+        {
+            "country": country,
+            "avg_nutriscore": round(stats["sum"] / stats["count"], 2),
+            "meals_count": stats["count"],
+            # running aggregate, lets incremental refreshes adjust the average
+            "score_sum": stats["sum"]
+        }
+        for country, stats in country_stats.items()
+        if stats["count"] > 0
+    ]
+
+    result.sort(key=lambda x: x["avg_nutriscore"], reverse=True)
+    return result
+
+
+async def replace_health_map(db, result: list[dict]):
+    """
+    Writes the new map to a temporary collection and renames it over the
+    old one, readers see either the previous map or the new one.
+    """
+    result_col = db[HEALTH_MAP_COLLECTION]
+
+    if not result:
+        await result_col.delete_many({})
+        return
+
+    tmp_col = db[_TMP_COLLECTION]
+    await tmp_col.drop()
+    await tmp_col.insert_many(result)
+    await tmp_col.rename(HEALTH_MAP_COLLECTION, dropTarget=True)
+
+
+async def rebuild_health_map(db) -> int:
+    """
+    Full rebuild of the health map. Meals are streamed from Mongo and
+    folded into running per-country sums, memory does not grow with
+    the size of the catalog.
+    """
+    country_stats = {}
+
+    async for meal in iter_calculated_meals(db):
+        stats = country_stats.setdefault(meal["country"], {"sum": 0, "count": 0})
+        stats["sum"] += meal["nutriscore"]
+        stats["count"] += 1
+
+    result = country_stats_to_docs(country_stats)
+    await replace_health_map(db, result)
+
+    logger = logging.getLogger(__name__)
+    logger.info(f"Health map recalculated for {len(result)} countries")
+    return len(result)
+
+
+async def update_health_map(db, previous: dict, meals: dict) -> int:
+    """
+    Adjusts the per-country aggregates with the difference between the
+    previous and the new version of some meals (see update_meal_nutrition),
+    instead of rebuilding the whole map.
+    """
+    result_col = db[HEALTH_MAP_COLLECTION]
+
+    deltas = {}
+    for meal in previous.values():
+        d = deltas.setdefault(meal["country"], {"sum": 0, "count": 0})
+        d["sum"] -= meal["nutriscore"]
+        d["count"] -= 1
+    for meal in meals.values():
+        d = deltas.setdefault(meal["country"], {"sum": 0, "count": 0})
+        d["sum"] += meal["nutriscore"]
+        d["count"] += 1
+
+    deltas = {c: d for c, d in deltas.items() if d["sum"] or d["count"]}
+    if not deltas:
+        return 0
+
+    await result_col.bulk_write([
+        UpdateOne(
+            {"country": country},
+            {"$inc": {"score_sum": d["sum"], "meals_count": d["count"]}},
+            upsert=True
+        )
+        for country, d in deltas.items()
+    ], ordered=False)
+
+    # recompute the average of the touched countries only
+    touched = await result_col.find({"country": {"$in": list(deltas)}}).to_list(length=None)
+    ops = []
+    for doc in touched:
+        if doc["meals_count"] <= 0:
+            ops.append(DeleteOne({"_id": doc["_id"]}))
+        else:
+            ops.append(UpdateOne(
+                {"_id": doc["_id"]},
+                {"$set": {"avg_nutriscore": round(doc["score_sum"] / doc["meals_count"], 2)}}
+            ))
+    if ops:
+        await result_col.bulk_write(ops, ordered=False)
+
+    logger = logging.getLogger(__name__)
+    logger.info(f"Health map updated for {len(deltas)} countries")
+    return len(deltas)
+
+
+async def health_map_is_incremental(db) -> bool:
+    """
+    The map can only be adjusted if it was built with running aggregates.
+    """
+    result_col = db[HEALTH_MAP_COLLECTION]
+    if await result_col.estimated_document_count() == 0:
+        return False
+    return await result_col.find_one({"score_sum": {"$exists": False}}) is None
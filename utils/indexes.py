@@ -0,0 +1,142 @@
+import logging
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+from utils.meal_nutrition import MEAL_NUTRITION_COLLECTION, MEAL_NUTRITION_INDEXES
+from utils.log_retention import LOG_TTL_INDEXES
+from utils.etl_runs import ETL_RUNS_COLLECTION, ETL_RUNS_INDEXES, ACTIVE_RUN_STATUSES
+from utils.etl_jobs import ETL_JOBS_COLLECTION, ETL_JOBS_INDEXES
+from utils.product_index import products_query
+
+# ============================
+# INDEX REGISTRY
+# ============================
+# collection -> indexes the query paths of the API and the loaders need.
+# results_etl is only read by _id, which Mongo always indexes.
+# A trailing _id serves the same lookups and lets the collection browser
+# filter on the field and still page by _id along the index.
+INDEXES = {
+    "users": [
+        IndexModel([("username", ASCENDING)], unique=True),
+    ],
+    "themealdb_clean": [
+        IndexModel([("mealID", ASCENDING), ("_id", ASCENDING)]),
+        IndexModel([("ingredient", ASCENDING), ("_id", ASCENDING)]),
+    ],
+    "openfoodfacts_clean": [
+        IndexModel([("search_term", ASCENDING), ("_id", ASCENDING)]),
+    ],
+    "mystats": [
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)]),
+    ],
+    "logs": [
+        # tail of one ETL run: pid + logger, newest first
+        IndexModel([
+            ("pid", ASCENDING), ("logger", ASCENDING),
+            ("timestamp", DESCENDING), ("seq", DESCENDING)
+        ]),
+        # per-logger retention (LOG_STORAGE_MODE=ttl)
+        *LOG_TTL_INDEXES,
+    ],
+    ETL_RUNS_COLLECTION: ETL_RUNS_INDEXES,
+    ETL_JOBS_COLLECTION: ETL_JOBS_INDEXES,
+    # rebuilt with tmp + rename, refresh_meal_nutrition creates these too
+    MEAL_NUTRITION_COLLECTION: [IndexModel(keys) for keys in MEAL_NUTRITION_INDEXES],
+}
+
+
+# query each route issues, with the stored types:
+# (route, collection, filter, sort, limit). A limit of None reads every
+# match, so walking a whole index is flagged; with a limit the scan stops
+# after one page. Full passes by design (meal_nutrition refresh, health
+# map) are not probed.
+CANONICAL_QUERIES = [
+    ("POST /token", "users", {"username": "admin"}, None, 1),
+    ("GET /versus/compare", "themealdb_clean", {"mealID": {"$in": [52772, 52771]}}, None, None),
+    ("POST /mystats", "themealdb_clean", {"mealID": 52772}, None, 1000),
+    ("POST /mystats (products)", "openfoodfacts_clean", {"search_term": "salt"}, None, 1),
+    ("meal_nutrition update", "themealdb_clean", {"ingredient": {"$in": ["salt"]}}, None, None),
+    ("product lookup (no product index)", "openfoodfacts_clean", products_query(["salt", "olive oil"]), None, None),
+    ("GET /mystats", "mystats", {"user_id": "0" * 24}, [("created_at", DESCENDING)], 1000),
+    ("GET /admin/etl-*/logs", "logs", {"pid": 1, "logger": "etl_api1"},
+        [("timestamp", DESCENDING), ("seq", DESCENDING)], 10),
+    ("GET /admin/etl-*/results", ETL_RUNS_COLLECTION,
+        {"pipeline": "themealdb", "status": {"$nin": list(ACTIVE_RUN_STATUSES)}}, [("started_at", DESCENDING)], 1),
+    ("GET /admin/etl-*/history", ETL_RUNS_COLLECTION, {"pipeline": "themealdb"},
+        [("started_at", DESCENDING), ("_id", DESCENDING)], 20),
+    ("GET /admin/etl-*/status", "results_etl", {"_id": "etl_api1"}, None, 1),
+    ("ETL job dispatch", ETL_JOBS_COLLECTION, {"status": "queued"}, [("requested_at", ASCENDING)], 100),
+    ("POST /admin/etl-*/run", ETL_JOBS_COLLECTION, {"pipeline": "themealdb", "status": "queued"}, None, 1),
+    ("GET /filters/meals", MEAL_NUTRITION_COLLECTION, {"nutrients.energy_kcal": {"$lte": 500}},
+        [("mealID", ASCENDING)], 101),
+    ("GET /filters/meals (no filter)", MEAL_NUTRITION_COLLECTION, {}, [("mealID", ASCENDING)], 101),
+]
+
+# bounds of a field that match every value (or every string)
+FULL_BOUNDS = {"[MinKey, MaxKey]", "[MaxKey, MinKey]", '["", {})', '({}, ""]'}
+
+
+async def ensure_indexes(db) -> dict:
+    """
+    Creates every index of the registry. create_indexes is a no-op for
+    indexes that already exist, so it is safe on every startup and load.
+    """
+    logger = logging.getLogger(__name__)
+    created = {}
+
+    for coll_name, models in INDEXES.items():
+        try:
+            created[coll_name] = await db[coll_name].create_indexes(models)
+        except OperationFailure as e:
+            # an index with the same keys but other options, leave it as is
+            logger.warning(f"Indexes of {coll_name} not applied: {e}")
+
+    logger.info(f"Indexes ensured on {len(created)} collections")
+    return created
+
+
+def _plan_nodes(plan) -> list:
+    nodes = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            nodes.append(plan)
+        for value in plan.values():
+            nodes.extend(_plan_nodes(value))
+    elif isinstance(plan, list):
+        for value in plan:
+            nodes.extend(_plan_nodes(value))
+    return nodes
+
+
+def _full_index_scan(node) -> bool:
+    # an IXSCAN whose leading field is not bounded walks the whole index
+    if node.get("stage") != "IXSCAN":
+        return False
+    bounds = list((node.get("indexBounds") or {}).values())
+    return bool(bounds) and any(b in FULL_BOUNDS for b in bounds[0])
+
+
+async def check_indexes(db) -> list[dict]:
+    """
+    Explains the canonical query of every route and reports the winning
+    plan: collscan when it reads the whole collection, unbounded when a
+    query without limit walks a whole index.
+    """
+    report = []
+    for route, coll_name, query, sort, limit in CANONICAL_QUERIES:
+        cursor = db[coll_name].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        if limit:
+            cursor = cursor.limit(limit)
+        explain = await cursor.explain()
+
+        nodes = _plan_nodes(explain.get("queryPlanner", {}).get("winningPlan", {}))
+        stages = [n["stage"] for n in nodes]
+        report.append({
+            "route": route,
+            "collection": coll_name,
+            "stages": stages,
+            "collscan": "COLLSCAN" in stages,
+            "unbounded": limit is None and any(_full_index_scan(n) for n in nodes)
+        })
+    return report
@@ -0,0 +1,69 @@
+import logging
+from utils.meal_nutrition import iter_meal_docs
+
+
+class IngredientIndex:
+    """
+    Process-local inverted index: normalized ingredient name -> mealIDs.
+
+    Search terms keep the substring semantics of the old
+    {"ingredient": {"$regex": term, "$options": "i"}} query, but they are
+    matched against the vocabulary of distinct ingredient names (a few
+    hundred entries) instead of every ingredient row of the catalog.
+    """
+
+    def __init__(self, meals: dict | None = None):
+        # mealID -> ingredient rows of the meal
+        self.meals = meals or {}
+        self.postings = {}
+
+        for meal_id, docs in self.meals.items():
+            for d in docs:
+                name = (d.get("ingredient") or "").strip().lower()
+                if name:
+                    self.postings.setdefault(name, set()).add(meal_id)
+
+    def __len__(self):
+        return len(self.meals)
+
+    def meals_matching(self, term: str) -> set:
+        meal_ids = set()
+        for name, ids in self.postings.items():
+            if term in name:
+                meal_ids |= ids
+        return meal_ids
+
+    def candidates(self, terms: list[str]) -> set:
+        meal_ids = set()
+        for term in terms:
+            meal_ids |= self.meals_matching(term)
+        return meal_ids
+
+
+class IngredientIndexManager:
+    index: IngredientIndex | None = None
+
+
+ingredient_index_manager = IngredientIndexManager()
+
+
+async def load_ingredient_index(db) -> IngredientIndex:
+    """
+    Builds a new index from themealdb_clean and swaps it in at once.
+    """
+    meals = {}
+    async for docs in iter_meal_docs(db["themealdb_clean"]):
+        meals[docs[0]["mealID"]] = docs
+
+    index = IngredientIndex(meals)
+    ingredient_index_manager.index = index
+
+    logger = logging.getLogger(__name__)
+    logger.info(f"Ingredient index built with {len(index)} meals")
+    return index
+
+
+async def get_ingredient_index(db) -> IngredientIndex:
+    if ingredient_index_manager.index is None:
+        return await load_ingredient_index(db)
+    return ingredient_index_manager.index
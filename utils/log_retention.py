@@ -0,0 +1,105 @@
+import datetime
+import functools
+import logging
+import os
+import re
+from pymongo import ASCENDING, IndexModel
+
+# "ttl": every record gets an expire_at from its logger policy and a TTL
+# index removes it. "capped": logs is a fixed size collection, the oldest
+# records are overwritten whatever their logger.
+LOG_STORAGE_MODE = os.getenv("LOG_STORAGE_MODE", "ttl")
+LOG_CAPPED_BYTES = int(os.getenv("LOG_CAPPED_BYTES", 512 * 1024 * 1024))
+
+LOG_RETENTION_DAYS = float(os.getenv("LOG_RETENTION_DAYS", 7))
+
+# logger name prefix -> days kept, the longest matching prefix wins,
+# 0 keeps the records forever. Run results live in etl_runs, not here.
+DEFAULT_RETENTION_POLICIES = {
+    "": LOG_RETENTION_DAYS,
+    "uvicorn": 1,
+    "etl_api1": 14,
+    "etl_api2": 14,
+}
+
+
+def parse_policies(value: str) -> dict:
+    """
+    "uvicorn.access=1,etl_api1=30" -> {"uvicorn.access": 1.0, "etl_api1": 30.0}
+    """
+    policies = {}
+    for item in value.split(","):
+        prefix, sep, days = item.strip().partition("=")
+        if sep:
+            policies[prefix.strip()] = float(days)
+    return policies
+
+
+RETENTION_POLICIES = {
+    **DEFAULT_RETENTION_POLICIES,
+    **parse_policies(os.getenv("LOG_RETENTION_POLICIES", ""))
+}
+
+LOG_TTL_INDEXES = [
+    IndexModel([("expire_at", ASCENDING)], expireAfterSeconds=0)
+] if LOG_STORAGE_MODE == "ttl" else []
+
+
+@functools.lru_cache(maxsize=1024)
+def retention_for(logger_name: str) -> datetime.timedelta | None:
+    prefix = max((p for p in RETENTION_POLICIES if logger_name.startswith(p)), key=len)
+    days = RETENTION_POLICIES[prefix]
+    return datetime.timedelta(days=days) if days > 0 else None
+
+
+def expire_at(logger_name: str, timestamp: datetime.datetime) -> datetime.datetime | None:
+    """
+    When a record of this logger may be removed, None to keep it.
+    """
+    if LOG_STORAGE_MODE != "ttl":
+        return None
+    retention = retention_for(logger_name)
+    return timestamp + retention if retention else None
+
+
+async def ensure_log_storage(db):
+    """
+    In capped mode creates logs as a capped collection. An existing
+    uncapped collection is left alone, converting it blocks the database.
+    """
+    if LOG_STORAGE_MODE != "capped":
+        return
+
+    logger = logging.getLogger(__name__)
+    if "logs" not in await db.list_collection_names():
+        await db.create_collection("logs", capped=True, size=LOG_CAPPED_BYTES)
+        logger.info(f"Capped logs collection created ({LOG_CAPPED_BYTES} bytes)")
+        return
+
+    options = await db["logs"].options()
+    if not options.get("capped"):
+        logger.warning("LOG_STORAGE_MODE is capped but logs is not, records are kept until removed")
+
+
+async def backfill_expire_at(db) -> int:
+    """
+    Sets expire_at on records written before retention existed, one
+    update per policy. Loggers of a longer prefix are left to its own policy.
+    """
+    updated = 0
+    for prefix in RETENTION_POLICIES:
+        retention = retention_for(prefix)
+        if retention is None:
+            continue
+
+        query = {"logger": {"$regex": f"^{re.escape(prefix)}"}, "expire_at": {"$exists": False}}
+        longer = [p for p in RETENTION_POLICIES if p != prefix and p.startswith(prefix)]
+        if longer:
+            query["$nor"] = [{"logger": {"$regex": f"^{re.escape(p)}"}} for p in longer]
+
+        result = await db["logs"].update_many(
+            query,
+            [{"$set": {"expire_at": {"$add": ["$timestamp", retention.total_seconds() * 1000]}}}]
+        )
+        updated += result.modified_count
+    return updated
@@ -0,0 +1,68 @@
+import asyncio
+import os
+
+LOG_STREAM_QUEUE_LIMIT = int(os.getenv("LOG_STREAM_QUEUE_LIMIT", 1000))
+
+# last item of the queue of a subscriber that fell behind
+LAGGING = object()
+
+
+class LogStream:
+    """
+    In-process fan-out of ETL output to the open live tails. ingest_output
+    publishes each batch of log documents once, every subscriber of the
+    run gets it through its own bounded queue. None marks the end of a run.
+    A subscriber whose queue fills up is dropped with LAGGING: it replays
+    from Mongo (every batch is inserted before it is published) and
+    subscribes again.
+    """
+
+    def __init__(self):
+        # run_id -> queues of the connected clients
+        self._subscribers = {}
+        self.lagged = 0
+
+    def subscribe(self, run_id: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=LOG_STREAM_QUEUE_LIMIT)
+        self._subscribers.setdefault(run_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, run_id: str, queue: asyncio.Queue):
+        queues = self._subscribers.get(run_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[run_id]
+
+    def publish(self, run_id: str, docs: list[dict]):
+        for queue in list(self._subscribers.get(run_id, ())):
+            try:
+                queue.put_nowait(docs)
+            except asyncio.QueueFull:
+                # the run doesn't wait for a client that can't keep up
+                self._lag(run_id, queue)
+
+    def _lag(self, run_id: str, queue: asyncio.Queue):
+        self.unsubscribe(run_id, queue)
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(LAGGING)
+        self.lagged += 1
+
+    def close(self, run_id: str):
+        for queue in self._subscribers.get(run_id, ()):
+            try:
+                queue.put_nowait(None)
+            except asyncio.QueueFull:
+                queue.get_nowait()
+                queue.put_nowait(None)
+
+    def stats(self) -> dict:
+        return {
+            "runs": len(self._subscribers),
+            "subscribers": sum(len(q) for q in self._subscribers.values()),
+            "lagged": self.lagged
+        }
+
+
+log_stream = LogStream()
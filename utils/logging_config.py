@@ -2,39 +2,146 @@ import logging
 import sys
 import datetime
 import asyncio
+import os
+import queue
 import database
+from utils.log_retention import expire_at
+
+# Mongo log sink: records are queued and written with insert_many
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", 200))
+LOG_FLUSH_INTERVAL = float(os.getenv("LOG_FLUSH_INTERVAL", 2))
+LOG_QUEUE_LIMIT = int(os.getenv("LOG_QUEUE_LIMIT", 10000))
+
+
+class MongoDBHandler(logging.Handler):
+    """
+    Buffers log records in a bounded queue, a background task writes them
+    to the logs collection in batches (every LOG_BATCH_SIZE records or
+    LOG_FLUSH_INTERVAL seconds). When the queue is full new records are
+    dropped and counted instead of piling up.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.queue = queue.Queue(maxsize=LOG_QUEUE_LIMIT)
+        self.dropped = 0
+        self.overflows = 0
+        self.written = 0
+        self._overflowing = False
+        self._task = None
+        self._wakeup = None
+
+    def emit(self, record):
+        try:
+            log_entry = self.format(record)
+            now = datetime.datetime.now(datetime.timezone.utc)
+            log_document = {
+                "timestamp": now,
+                "level": record.levelname,
+                "message": record.getMessage(),
+                "logger": record.name,
+                "pid": getattr(record, "pid", record.process), # in case it's a sub process i want to specify
+                "raw": log_entry
+            }
+            expires = expire_at(record.name, now)
+            if expires:
+                log_document["expire_at"] = expires
+            self.queue.put_nowait(log_document)
+            self._overflowing = False
+        except queue.Full:
+            self.dropped += 1
+            if not self._overflowing:
+                # one overflow per run of consecutive drops
+                self.overflows += 1
+                self._overflowing = True
+            return
+        except Exception:
+            self.handleError(record)
+            return
+
+        # enough records for a batch: flush now instead of waiting the timer
+        if self._wakeup is not None and self.queue.qsize() >= LOG_BATCH_SIZE:
+            try:
+                asyncio.get_running_loop()
+                self._wakeup.set()
+            except RuntimeError:
+                pass # not in the loop thread, the timer will flush it
+
+    def _drain(self) -> list:
+        batch = []
+        while len(batch) < LOG_BATCH_SIZE:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    async def flush_async(self):
+        """
+        Writes everything queued so far.
+        """
+        while True:
+            batch = self._drain()
+            if not batch:
+                return
+            if database.db_manager.db is None:
+                self.dropped += len(batch)
+                continue
+            try:
+                await database.db_manager.db["logs"].insert_many(batch, ordered=False)
+                self.written += len(batch)
+            except Exception:
+                # can't log here, it would come back to this handler
+                self.dropped += len(batch)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), LOG_FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush_async()
+
+    def start(self):
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush_async()
+
+    def stats(self) -> dict:
+        return {
+            "queued": self.queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "overflows": self.overflows
+        }
+
+
+mongo_log_handler = MongoDBHandler()
+
 
 def setup_logging():
     """
     Configure logging for the application.
     """
-    class MongoDBHandler(logging.Handler):
-        def emit(self, record):
-            if database.db_manager.db is not None:
-                log_entry = self.format(record)
-                log_document = {
-                    "timestamp": datetime.datetime.now(datetime.timezone.utc),
-                    "level": record.levelname,
-                    "message": record.getMessage(),
-                    "logger": record.name,
-                    "pid": getattr(record, "pid", record.process), # in case it's a sub process i want to specify
-                    "raw": log_entry
-                }
-                # Use asyncio.create_task to run the async insert without blocking
-                try:
-                    asyncio.create_task(database.db_manager.db["logs"].insert_one(log_document))
-                except Exception:
-                    # Fallback or ignore if event loop is closed or other issues
-                    pass
-
     logging.basicConfig(
         level=logging.INFO,
         format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
         handlers=[
             logging.StreamHandler(sys.stdout),
-            MongoDBHandler()
+            mongo_log_handler
         ]
     )
-    
+
     # Set lower level for some noisy libraries if needed
     logging.getLogger("uvicorn.access").setLevel(logging.DEBUG)
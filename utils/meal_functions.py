@@ -1,5 +1,8 @@
 import re
 import math
+import numpy as np
+from utils.nutrient_kernel import NUTRIENT_KEYS, PRODUCT_KEYS, meal_totals_and_scores
+from utils.product_index import resolve_products
 
 # ============================
 # EXTRACT GRAMS
@@ -57,11 +60,16 @@ def calculate_meal_nutriscore(nutrients):
 # ============================
 # BASE NUTRIENT CALCULATOR
 # ============================
-async def _calculate_nutrients(
+def _ingredient_name(ing: dict) -> str:
+    return (ing.get("ingredient") or "").lower()
+
+
+def _sum_nutrients(
     ingredients: list,
-    products_col,
+    products: dict,
     ingredient_filter: list[str] | None = None
 ) -> tuple[dict, int]:
+    # products: ingredient name -> product (already resolved, no I/O here)
     totals = {
         "energy_kcal": 0.0,
         "fat": 0.0,
@@ -72,7 +80,7 @@ async def _calculate_nutrients(
     used = 0
 
     for ing in ingredients:
-        name = (ing.get("ingredient") or "").lower()
+        name = _ingredient_name(ing)
         grams = extract_grams(ing.get("measure"))
 
         if not name or not grams:
@@ -81,9 +89,7 @@ async def _calculate_nutrients(
         if ingredient_filter and not any(f in name for f in ingredient_filter):
             continue
 
-        product = await products_col.find_one({
-            "search_term": {"$regex": f"^{name}", "$options": "i"}
-        })
+        product = products.get(name)
 
         if not product:
             continue
@@ -101,47 +107,140 @@ async def _calculate_nutrients(
 
 
 # ============================
-# PUBLIC WRAPPERS
+# MEALS FROM DOCS
 # ============================
-async def calculate_nutrients_for_ingredients(ingredients: list, products_col):
-    return await _calculate_nutrients(ingredients, products_col)
+def _meals_from_docs(docs_by_meal: dict, products: dict) -> dict:
+    """
+    mealID -> meal for the meals with at least one matched ingredient.
+    Ingredient rows of every meal are put in one matrix and totals and
+    scores come from the NumPy kernel.
+    """
+    meals = list(docs_by_meal.items())
+    values, grams, index = [], [], []
+
+    for i, (_, docs) in enumerate(meals):
+        for ing in docs:
+            name = _ingredient_name(ing)
+            g = extract_grams(ing.get("measure"))
+            if not name or not g:
+                continue
+
+            product = products.get(name)
+            if not product:
+                continue
+
+            values.append([product.get(k, 0) or 0 for k in PRODUCT_KEYS])
+            grams.append(g)
+            index.append(i)
+
+    if not index:
+        return {}
+
+    totals, scores, used = meal_totals_and_scores(
+        np.array(values, dtype=np.float64),
+        np.array(grams, dtype=np.float64),
+        np.array(index),
+        len(meals)
+    )
 
+    results = {}
+    for i, (meal_id, docs) in enumerate(meals):
+        if used[i] == 0:
+            continue
 
-async def calculate_nutrients_for_filtered_ingredients(
-    meal_ingredients: list,
-    search_ingredients: list[str],
-    products_col
-):
-    return await _calculate_nutrients(
-        meal_ingredients,
-        products_col,
-        ingredient_filter=search_ingredients
-    )
+        results[meal_id] = {
+            "mealID": docs[0]["mealID"],
+            "name": docs[0]["name"],
+            "country": docs[0]["country"],
+            "image": docs[0]["imageURL"],
+            "nutrients": {
+                k: round(float(v), 2) for k, v in zip(NUTRIENT_KEYS, totals[i])
+            },
+            "nutriscore": int(scores[i]),
+            "ingredients_used": int(used[i])
+        }
+    return results
 
 
 # ============================
-# MEAL FROM DOCS
+# BATCHED MEALS
 # ============================
-async def calculate_meal_from_docs(docs: list, products_col) -> dict | None:
-    if not docs:
-        return None
+MEAL_DOC_PROJECTION = {
+    "_id": 0,
+    "mealID": 1,
+    "name": 1,
+    "country": 1,
+    "imageURL": 1,
+    "ingredient": 1,
+    "measure": 1
+}
+
+
+def group_docs_by_meal(docs: list) -> dict:
+    meals = {}
+    for d in docs:
+        meals.setdefault(d.get("mealID"), []).append(d)
+    return meals
+
+
+async def fetch_meal_docs(meal_ids, meals_col) -> dict:
+    """
+    Ingredient rows of all the given meals in one query, grouped by mealID.
+    """
+    docs = await meals_col.find(
+        {"mealID": {"$in": list(meal_ids)}},
+        MEAL_DOC_PROJECTION
+    ).to_list(length=None)
+    return group_docs_by_meal(docs)
+
+
+async def calculate_meals_from_docs(docs_by_meal: dict, products_col) -> dict:
+    """
+    mealID -> meal (name, country, image, nutrients, nutriscore,
+    ingredients_used), with the products of all the meals resolved
+    together. Meals without nutrients are left out.
+    """
+    names = {
+        _ingredient_name(d)
+        for docs in docs_by_meal.values()
+        for d in docs
+    }
+    products = await resolve_products(names, products_col)
+    return _meals_from_docs(docs_by_meal, products)
 
-    totals, used = await calculate_nutrients_for_ingredients(docs, products_col)
 
-    if used == 0:
-        return None
+async def calculate_filtered_nutrients_for_meals(
+    docs_by_meal: dict,
+    search_ingredients: list[str],
+    products_col
+) -> dict:
+    """
+    mealID -> (totals, used) counting only the searched ingredients,
+    with the products of all the meals resolved together.
+    """
+    names = {
+        _ingredient_name(d)
+        for docs in docs_by_meal.values()
+        for d in docs
+    }
+    products = await resolve_products(names, products_col)
 
     return {
-        "mealID": docs[0]["mealID"],
-        "name": docs[0]["name"],
-        "country": docs[0]["country"],
-        "image": docs[0]["imageURL"],
-        "nutrients": {k: round(v, 2) for k, v in totals.items()},
-        "nutriscore": calculate_meal_nutriscore(totals),
-        "ingredients_used": used
+        meal_id: _sum_nutrients(docs, products, ingredient_filter=search_ingredients)
+        for meal_id, docs in docs_by_meal.items()
     }
 
 
+async def calculate_meals(meal_ids, meals_col, products_col) -> dict:
+    """
+    mealID -> meal (as calculate_meals_from_docs) for one or many meals,
+    in a fixed number of queries: one for the ingredient rows, at most one
+    for the products.
+    """
+    docs_by_meal = await fetch_meal_docs(meal_ids, meals_col)
+    return await calculate_meals_from_docs(docs_by_meal, products_col)
+
+
 # ============================
 # HELPERS
 # ============================
@@ -161,4 +260,4 @@ def get_matched_ingredients(
             if s in name:
                 matched.add(s)
 
-    return list(matched)
+    return sorted(matched)
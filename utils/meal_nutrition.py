@@ -0,0 +1,187 @@
+import logging
+from pymongo import ASCENDING, DeleteOne, ReplaceOne
+from utils.meal_functions import MEAL_DOC_PROJECTION, calculate_meals, calculate_meals_from_docs
+
+MEAL_NUTRITION_COLLECTION = "meal_nutrition"
+_TMP_COLLECTION = f"{MEAL_NUTRITION_COLLECTION}_tmp"
+
+NUTRIENT_FIELDS = ("energy_kcal", "fat", "carbohydrates", "proteins", "salt")
+
+# mealID alone serves the cursor pagination of /filters/meals in order.
+# The per-nutrient indexes bound the ranges of the filters, but a range
+# followed by the mealID sort still needs an in-memory SORT of the
+# matched meals; the planner picks whichever is cheaper. Only an
+# equality (country) keeps the trailing mealID in order.
+MEAL_NUTRITION_INDEXES = [
+    [("mealID", ASCENDING)],
+] + [
+    [(f"nutrients.{field}", ASCENDING), ("mealID", ASCENDING)]
+    for field in NUTRIENT_FIELDS
+] + [
+    [("nutriscore", ASCENDING), ("mealID", ASCENDING)],
+    [("country", ASCENDING), ("mealID", ASCENDING)],
+]
+
+
+# ============================
+# BUILD
+# ============================
+async def iter_meal_docs(meals_col, batch_size: int = 1000):
+    """
+    Yields the ingredient rows of every meal, one list per meal.
+    Rows are streamed sorted by mealID so only one meal is kept in memory.
+    """
+    current_id = None
+    docs = []
+
+    cursor = (
+        meals_col.find({}, MEAL_DOC_PROJECTION, allow_disk_use=True)
+        .sort("mealID", ASCENDING)
+        .batch_size(batch_size)
+    )
+    async for row in cursor:
+        if row.get("mealID") != current_id and docs:
+            yield docs
+            docs = []
+        current_id = row.get("mealID")
+        docs.append(row)
+
+    if docs:
+        yield docs
+
+
+async def iter_calculated_meals(db, chunk_size: int = 500):
+    """
+    Yields every meal with nutrients (as calculate_meals_from_docs), chunk
+    by chunk: at most chunk_size meals are held in memory at once.
+    """
+    products_col = db["openfoodfacts_clean"]
+
+    chunk = {}
+    async for docs in iter_meal_docs(db["themealdb_clean"]):
+        chunk[docs[0]["mealID"]] = docs
+        if len(chunk) >= chunk_size:
+            # products of the whole chunk are resolved together
+            meals = await calculate_meals_from_docs(chunk, products_col)
+            for meal in meals.values():
+                yield meal
+            chunk = {}
+
+    if chunk:
+        meals = await calculate_meals_from_docs(chunk, products_col)
+        for meal in meals.values():
+            yield meal
+
+
+def meal_to_nutrition_doc(meal: dict) -> dict:
+    return {"_id": meal["mealID"], **meal}
+
+
+async def refresh_meal_nutrition(db) -> int:
+    """
+    Rebuilds the meal_nutrition collection (one document per meal).
+    The new data is written to a temporary collection and swapped in
+    with a rename, so readers never see a half-built view.
+    """
+    logger = logging.getLogger(__name__)
+
+    tmp_col = db[_TMP_COLLECTION]
+
+    await tmp_col.drop()
+
+    total = 0
+    batch = []
+
+    async for meal in iter_calculated_meals(db):
+        batch.append(meal_to_nutrition_doc(meal))
+        if len(batch) >= 500:
+            await tmp_col.insert_many(batch, ordered=False)
+            total += len(batch)
+            batch = []
+
+    if batch:
+        await tmp_col.insert_many(batch, ordered=False)
+        total += len(batch)
+
+    if total == 0:
+        logger.info("meal_nutrition refresh skipped: no meals with nutrients")
+        return 0
+
+    for keys in MEAL_NUTRITION_INDEXES:
+        await tmp_col.create_index(keys)
+
+    await tmp_col.rename(MEAL_NUTRITION_COLLECTION, dropTarget=True)
+    logger.info(f"meal_nutrition refreshed with {total} meals")
+
+    return total
+
+
+# ============================
+# INCREMENTAL
+# ============================
+async def changed_meal_ids(db, inserted: dict) -> set:
+    """
+    Meals whose nutrition may have changed after a load.
+    inserted: collection -> records written by the loader.
+
+    - meals with new ingredient rows
+    - meals using an ingredient that is a prefix of a new product
+      search_term, the only names whose product lookup can change
+    """
+    meals_col = db["themealdb_clean"]
+
+    meal_ids = {
+        r["mealID"]
+        for r in inserted.get("themealdb_clean", [])
+        if r.get("mealID") is not None
+    }
+
+    new_terms = {
+        r["search_term"].lower()
+        for r in inserted.get("openfoodfacts_clean", [])
+        if isinstance(r.get("search_term"), str)
+    }
+    if not new_terms:
+        return meal_ids
+
+    prefixes = {t[:i] for t in new_terms for i in range(1, len(t) + 1)}
+    ingredients = [
+        i for i in await meals_col.distinct("ingredient")
+        if isinstance(i, str) and i.lower() in prefixes
+    ]
+
+    if ingredients:
+        meal_ids.update(
+            await meals_col.distinct("mealID", {"ingredient": {"$in": ingredients}})
+        )
+
+    return meal_ids
+
+
+async def update_meal_nutrition(db, meal_ids) -> tuple[dict, dict]:
+    """
+    Recalculates only the given meals in meal_nutrition.
+    Returns (previous documents, new meals), both keyed by mealID, so
+    aggregates built on top can be adjusted with the difference.
+    """
+    nutrition_col = db[MEAL_NUTRITION_COLLECTION]
+    meal_ids = list(meal_ids)
+
+    previous = {
+        d["_id"]: d
+        for d in await nutrition_col.find({"_id": {"$in": meal_ids}}).to_list(length=None)
+    }
+    meals = await calculate_meals(meal_ids, db["themealdb_clean"], db["openfoodfacts_clean"])
+
+    ops = [
+        ReplaceOne({"_id": meal_id}, meal_to_nutrition_doc(meals[meal_id]), upsert=True)
+        if meal_id in meals else DeleteOne({"_id": meal_id})
+        for meal_id in meal_ids
+    ]
+    if ops:
+        await nutrition_col.bulk_write(ops, ordered=False)
+
+    logger = logging.getLogger(__name__)
+    logger.info(f"meal_nutrition updated for {len(meal_ids)} meals")
+
+    return previous, meals
@@ -0,0 +1,76 @@
+import numpy as np
+
+# column order of every nutrient matrix
+NUTRIENT_KEYS = ("energy_kcal", "fat", "carbohydrates", "proteins", "salt")
+PRODUCT_KEYS = tuple(f"{k}_100g" for k in NUTRIENT_KEYS)
+
+_ENERGY, _FAT, _CARBS, _PROTEINS, _SALT = range(len(NUTRIENT_KEYS))
+
+
+# ============================
+# TOTALS
+# ============================
+def nutrient_totals(
+    values_100g: np.ndarray,
+    grams: np.ndarray,
+    meal_index: np.ndarray,
+    n_meals: int
+) -> np.ndarray:
+    """
+    values_100g: (ingredients x 5) nutrients per 100g of each ingredient
+    grams:       (ingredients,) grams of each ingredient
+    meal_index:  (ingredients,) meal each ingredient belongs to, 0..n_meals-1
+
+    Returns the (n_meals x 5) totals. Rows are added in order, so the sums
+    are the same as the ingredient loop in meal_functions.
+    """
+    values_100g = np.asarray(values_100g, dtype=np.float64).reshape(-1, len(NUTRIENT_KEYS))
+    factor = np.asarray(grams, dtype=np.float64) / 100
+    contributions = values_100g * factor[:, None]
+
+    totals = np.empty((n_meals, len(NUTRIENT_KEYS)), dtype=np.float64)
+    for col in range(len(NUTRIENT_KEYS)):
+        totals[:, col] = np.bincount(
+            meal_index,
+            weights=contributions[:, col],
+            minlength=n_meals
+        )
+    return totals
+
+
+# ============================
+# NUTRISCORE
+# ============================
+def nutriscores(totals: np.ndarray) -> np.ndarray:
+    """
+    Vectorized calculate_meal_nutriscore: one 0-100 score per row of totals.
+    """
+    totals = np.asarray(totals, dtype=np.float64).reshape(-1, len(NUTRIENT_KEYS))
+    logs = np.log1p(totals)
+
+    # same weights and operation order as the scalar version
+    negative_score = 1.0 * logs[:, _ENERGY] + 2.5 * logs[:, _FAT] + 3.0 * logs[:, _SALT]
+    positive_score = 4.0 * logs[:, _PROTEINS] + 2.0 * logs[:, _CARBS]
+
+    score = positive_score - negative_score
+
+    normalized = 50 + score * 10
+    normalized = np.clip(normalized, 0, 100)
+
+    return np.rint(normalized).astype(np.int64)
+
+
+def meal_totals_and_scores(
+    values_100g: np.ndarray,
+    grams: np.ndarray,
+    meal_index: np.ndarray,
+    n_meals: int
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    totals (n_meals x 5), scores (n_meals,) and ingredients used (n_meals,)
+    """
+    meal_index = np.asarray(meal_index, dtype=np.int64)
+    totals = nutrient_totals(values_100g, grams, meal_index, n_meals)
+    used = np.bincount(meal_index, minlength=n_meals)
+    return totals, nutriscores(totals), used
+
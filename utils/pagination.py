@@ -0,0 +1,31 @@
+import base64
+import json
+from bson import ObjectId
+from fastapi import HTTPException
+
+
+# ============================
+# OPAQUE CURSORS
+# ============================
+def encode_cursor(last_key) -> str:
+    """
+    Opaque token for keyset pagination: the key of the last document
+    returned, clients only send it back to get the next page.
+    """
+    if isinstance(last_key, ObjectId):
+        payload = {"oid": str(last_key)}
+    else:
+        payload = {"k": last_key}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str):
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json.loads(raw)
+        if "oid" in payload:
+            return ObjectId(payload["oid"])
+        return payload["k"]
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
@@ -1,19 +1,103 @@
 from mongo.mongo_async import MongoLoaderAsync
 from mongo.service import load_all_async
-from datetime import datetime
+from datetime import datetime, timezone
 import asyncio
+import logging
+import time
+from utils.etl_runs import parse_run_stats, record_stats, finish_run
+from utils.log_stream import log_stream
+from utils.log_retention import expire_at
 
-async def watch_process_load(process, name, db_manager, logger, logger_output):
+READ_CHUNK_SIZE = 64 * 1024
+LINES_BATCH_SIZE = 500
+
+
+def lines_to_docs(lines, name, pid, run_id, first_seq):
+    now = datetime.now(timezone.utc)
+    expires = expire_at(name, now)
+    docs = [
+        {
+            "timestamp": now,
+            "level": "INFO",
+            "message": msg,
+            "logger": name,
+            "pid": pid,
+            "run_id": run_id,
+            # keeps the order of the lines, the timestamp is shared per batch
+            "seq": first_seq + i,
+            "raw": msg
+        }
+        for i, msg in enumerate(lines)
+    ]
+    if expires:
+        for doc in docs:
+            doc["expire_at"] = expires
+    return docs
+
+
+async def ingest_output(process, name, db_manager, run_id):
+    """
+    Reads the subprocess output in chunks and writes its lines to the logs
+    collection in batches (one insert_many per chunk read). Each batch is
+    also pushed to the live tails, stats lines go to etl_runs.
+    A batch that can't be stored is counted and dropped, stdout keeps
+    being drained so the ETL never blocks on a full pipe. Returns the
+    number of lines dropped.
+    """
+    logs = db_manager.db.logs
+    logger = logging.getLogger(__name__)
+    seq = 0
+    dropped = 0
+    pending = b""
+
+    async def store(docs):
+        nonlocal dropped
+        try:
+            await logs.insert_many(docs)
+        except Exception as e:
+            dropped += len(docs)
+            logger.error(f"{name}: {len(docs)} log lines of run {run_id} not stored: {e}")
+        log_stream.publish(run_id, docs)
+
+    while True:
+        chunk = await process.stdout.read(READ_CHUNK_SIZE)
+        if not chunk:
+            break
+
+        *raw_lines, pending = (pending + chunk).split(b"\n")
+        lines = [l.decode(errors="replace").strip() for l in raw_lines]
+        lines = [l for l in lines if l]
+
+        for line in lines:
+            stats = parse_run_stats(line)
+            if stats:
+                try:
+                    await record_stats(db_manager.db, run_id, stats)
+                except Exception as e:
+                    logger.error(f"{name}: stats of run {run_id} not stored: {e}")
+
+        for i in range(0, len(lines), LINES_BATCH_SIZE):
+            batch = lines[i:i + LINES_BATCH_SIZE]
+            await store(lines_to_docs(batch, name, process.pid, run_id, seq))
+            seq += len(batch)
+
+    last = pending.decode(errors="replace").strip()
+    if last:
+        await store(lines_to_docs([last], name, process.pid, run_id, seq))
+
+    return dropped
+
+
+async def watch_process_load(process, name, db_manager, logger_output, run_id):
     results = db_manager.db.results_etl
 
     try:
         #save logs in mongoDB
-        while True:
-            line = await process.stdout.readline()
-            if not line:
-                break
-            msg = line.decode().strip()
-            logger.info(msg, extra={"pid": process.pid})
+        dropped = await ingest_output(process, name, db_manager, run_id)
+        if dropped:
+            logger_output.info(
+                f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [logs] {dropped} lines could not be stored"
+            )
 
         #wait to end the process
         returncode = await process.wait()
@@ -22,7 +106,9 @@ async def watch_process_load(process, name, db_manager, logger, logger_output):
             try:
                 # if everything it's fine launch de upload
                 loader = MongoLoaderAsync(db_manager.client, db_manager.db.name)
+                started = time.perf_counter()
                 output = await load_all_async(loader)
+                load_seconds = time.perf_counter() - started
                 if not output:
                     output = f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [mongo] [async] No new records"
                 else:
@@ -35,6 +121,11 @@ async def watch_process_load(process, name, db_manager, logger, logger_output):
                         "finished_at": datetime.utcnow()
                     }}
                 )
+                await finish_run(
+                    db_manager.db, run_id, "finished", result=output,
+                    loaded=sum(len(r) for r in loader.inserted.values()),
+                    load_seconds=load_seconds
+                )
 
             except Exception as e:
                 error_msg = f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [mongo] [async] {str(e)}"
@@ -46,6 +137,7 @@ async def watch_process_load(process, name, db_manager, logger, logger_output):
                         "error": str(e)
                     }}
                 )
+                await finish_run(db_manager.db, run_id, "error", result=error_msg, error=str(e))
         else:
             error_msg = f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [mongo] [async] ETL process failed"
             logger_output.info(error_msg)
@@ -56,6 +148,7 @@ async def watch_process_load(process, name, db_manager, logger, logger_output):
                     "error": "ETL process failed"
                 }}
             )
+            await finish_run(db_manager.db, run_id, "error", result=error_msg, error="ETL process failed")
 
     except asyncio.CancelledError:
         try:
@@ -74,4 +167,23 @@ async def watch_process_load(process, name, db_manager, logger, logger_output):
                 "finished_at": datetime.utcnow(),
                 "error": "Cancelled by user"
             }}
-        )
\ No newline at end of file
+        )
+        await finish_run(db_manager.db, run_id, "cancelled", result=error_msg, error="Cancelled by user")
+
+    except Exception as e:
+        # the run must not stay "running" whatever failed on the way
+        error_msg = f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [watcher] {str(e)}"
+        logger_output.info(error_msg)
+        await results.update_one(
+            {"_id": name},
+            {"$set": {
+                "status": "error",
+                "finished_at": datetime.utcnow(),
+                "error": str(e)
+            }}
+        )
+        await finish_run(db_manager.db, run_id, "error", result=error_msg, error=str(e))
+
+    finally:
+        # live tails of this run get their end event
+        log_stream.close(run_id)
@@ -0,0 +1,107 @@
+import bisect
+import re
+import logging
+
+PRODUCT_FIELDS = (
+    "energy_kcal_100g",
+    "fat_100g",
+    "carbohydrates_100g",
+    "proteins_100g",
+    "salt_100g"
+)
+
+
+class ProductIndex:
+    """
+    Process-local prefix index over openfoodfacts_clean.
+
+    Same answer as
+        find_one({"search_term": {"$regex": "^name", "$options": "i"}})
+    but served from a sorted array of normalized search terms instead of
+    a collection scan. When several products match, the one that came
+    first in the collection wins, like find_one in natural order.
+    """
+
+    def __init__(self, products=None):
+        # search_term -> (position in the collection, product)
+        first = {}
+        for rank, product in enumerate(products or []):
+            term = product.get("search_term")
+            if not isinstance(term, str):
+                continue
+            first.setdefault(term.lower(), (rank, product))
+
+        self._first = first
+        self._terms = sorted(first)
+        self._cache = {}
+
+    def __len__(self):
+        return len(self._terms)
+
+    def lookup(self, name: str) -> dict | None:
+        name = name.lower()
+        if name in self._cache:
+            return self._cache[name]
+
+        best = None
+        i = bisect.bisect_left(self._terms, name)
+        while i < len(self._terms) and self._terms[i].startswith(name):
+            candidate = self._first[self._terms[i]]
+            if best is None or candidate[0] < best[0]:
+                best = candidate
+            i += 1
+
+        product = best[1] if best else None
+        self._cache[name] = product
+        return product
+
+
+class ProductIndexManager:
+    index: ProductIndex | None = None
+
+
+product_index_manager = ProductIndexManager()
+
+
+async def load_product_index(db) -> ProductIndex:
+    """
+    Builds a new index from openfoodfacts_clean and swaps it in at once,
+    readers keep using the previous one until the new one is complete.
+    """
+    projection = {"_id": 0, "search_term": 1, **{f: 1 for f in PRODUCT_FIELDS}}
+    products = await db["openfoodfacts_clean"].find({}, projection).to_list(length=None)
+
+    index = ProductIndex(products)
+    product_index_manager.index = index
+
+    logger = logging.getLogger(__name__)
+    logger.info(f"Product index built with {len(index)} search terms")
+    return index
+
+
+def products_query(names) -> dict:
+    # search_term is stored lowercase (openfoodfacts transform), so one
+    # case-sensitive prefix regex per name keeps the index scan bounded
+    return {"search_term": {"$in": [re.compile("^" + re.escape(n)) for n in sorted(names)]}}
+
+
+async def resolve_products(names, products_col) -> dict:
+    """
+    ingredient name -> product for all the names at once: from the
+    in-memory index when it is loaded, otherwise with a single prefix
+    query on Mongo whose candidates are resolved locally.
+    """
+    names = {n.lower() for n in names if n}
+    if not names:
+        return {}
+
+    index = product_index_manager.index
+    if index is None:
+        projection = {"_id": 0, "search_term": 1, **{f: 1 for f in PRODUCT_FIELDS}}
+        candidates = await products_col.find(
+            products_query(names),
+            projection
+        ).to_list(length=None)
+        index = ProductIndex(candidates)
+
+    return {name: index.lookup(name) for name in names}